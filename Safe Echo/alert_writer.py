@@ -0,0 +1,185 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+import telemetry
+
+
+class AlertWriter:
+    """
+    Background group-commit writer for the alert store.
+    Producers only enqueue; a single thread drains the queue and commits
+    whatever has piled up as one transaction, so disk I/O stays off the
+    detection path and concurrent producers can never overwrite each other.
+
+    A batch that still fails after max_attempts (with backoff) is appended
+    to a spill file next to the store and replayed after the next
+    successful commit; it counts as failed, so flush() returns False.
+    """
+
+    def __init__(self, store, max_queue=10000, max_batch=500, linger=0.05, put_timeout=2.0,
+                 max_attempts=5, spill_path=None):
+        self.store = store
+        self.max_batch = max_batch
+        self.linger = linger            # how long to wait for more alerts before committing
+        self.put_timeout = put_timeout  # backpressure: how long a producer may block on a full queue
+        self.max_attempts = max_attempts
+        if spill_path is None and getattr(store, "path", None):
+            spill_path = store.path + ".spill.jsonl"
+        self.spill_path = spill_path
+        self.healthy = True             # False while commits are failing
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._submitted = 0
+        self._done = 0                  # committed or failed
+        self._failed = 0
+        self._thread = None
+        self._closed = False
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="alert-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def submit(self, alerts):
+        """
+        Queue alerts for the next batch.
+        Blocks while the queue is full; if it stays full for put_timeout the
+        alerts are written synchronously on the caller's thread instead of
+        being dropped.
+        Returns False if the store is currently failing to commit.
+        """
+        if self._closed:
+            with self._cond:
+                self._submitted += len(alerts)
+            return self._commit(alerts)
+        self._ensure_started()
+        with self._cond:
+            self._submitted += len(alerts)
+        for i, alert in enumerate(alerts):
+            try:
+                self._queue.put(alert, timeout=self.put_timeout)
+            except queue.Full:
+                telemetry.inc("safeecho_alert_queue_full_total")
+                return self._commit(alerts[i:])
+        return self.healthy
+
+    def _mark_done(self, n, failed=False):
+        with self._cond:
+            self._done += n
+            if failed:
+                self._failed += n
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._commit(batch)
+
+    def _commit(self, batch):
+        """Commit one batch with retries; spill it if every attempt fails. Returns success."""
+        delay = 0.1
+        for attempt in range(self.max_attempts):
+            try:
+                with telemetry.span("alert_commit"):
+                    self.store.append(batch)
+            except Exception as e:
+                telemetry.inc("safeecho_errors_total", stage="alert_commit")
+                print(f"Error committing {len(batch)} alerts (attempt {attempt + 1}): {e}")
+                if attempt + 1 < self.max_attempts:
+                    time.sleep(delay)
+                    delay = min(delay * 2, 2.0)
+                continue
+            telemetry.inc("safeecho_alerts_committed_total", len(batch))
+            self.healthy = True
+            self._mark_done(len(batch))
+            self._replay_spill()
+            return True
+
+        self.healthy = False
+        telemetry.inc("safeecho_alerts_failed_total", len(batch))
+        self._spill(batch)
+        self._mark_done(len(batch), failed=True)
+        return False
+
+    def _spill(self, batch):
+        if not self.spill_path:
+            print(f"Dropping {len(batch)} alerts: no spill file configured")
+            return
+        try:
+            with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as f:
+                for alert in batch:
+                    f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Error spilling {len(batch)} alerts: {e}")
+
+    def _replay_spill(self):
+        """Commit alerts spilled by earlier failures (the store works again)."""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, encoding="utf-8") as f:
+                    spilled = [json.loads(line) for line in f if line.strip()]
+                if spilled:
+                    self.store.append(spilled)
+                    telemetry.inc("safeecho_alerts_committed_total", len(spilled))
+                os.remove(self.spill_path)
+            except Exception as e:
+                print(f"Error replaying spilled alerts: {e}")
+
+    def flush(self, timeout=None):
+        """
+        Wait until every alert submitted so far has been processed.
+        Returns False on timeout or if any of them failed to commit.
+        """
+        with self._cond:
+            target = self._submitted
+            failed = self._failed
+            done = self._cond.wait_for(lambda: self._done >= target, timeout=timeout)
+            return done and self._failed == failed
+
+    def close(self, timeout=10):
+        """Flush pending alerts and stop the writer thread (registered with atexit)."""
+        if self._closed:
+            return
+        self.flush(timeout=timeout)
+        self._closed = True
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+        # Anything that slipped in while closing is written directly
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self._commit(leftover)
@@ -1,6 +1,15 @@
+from datetime import datetime
+
 import streamlit as st
 import guardian
 import db
+import reputation
+import speech
+import telemetry
+from live_monitor import LiveMonitor
+
+# Alerts shown per page on the Caregiver dashboard
+ALERT_PAGE_SIZE = 20
 
 # Page Config
 st.set_page_config(
@@ -9,7 +18,73 @@ st.set_page_config(
     layout="centered"
 )
 
+def time_ago(timestamp):
+    """'2h ago' style age of an ISO timestamp ('never' if None)."""
+    if not timestamp:
+        return "never"
+    seconds = (datetime.now() - datetime.fromisoformat(timestamp)).total_seconds()
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)}h ago"
+    return f"{int(seconds // 86400)}d ago"
+
+@st.cache_resource(show_spinner="Loading SafeEcho...")
+def shared_resources():
+    """
+    Model registry, alert store and alert writer, loaded once per server
+    process and shared by every browser session. The registry still picks
+    up newly activated model versions on its own.
+    """
+    db.init_db()
+    db.start_compactor()
+    telemetry.start_configured_server()
+    guardian.current_model()
+    reputation.get_index()
+    return guardian.registry, db.get_store(), db.get_writer()
+
+# Everyone the caregiver watches, in one merged alert log
+ALL_USERS = "Everyone"
+
+# Cached query results are keyed on the user's store write counter, so any
+# new or updated alert invalidates them and every session shares the same entries.
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_alert_page(user, store_version, limit, cursor, alert_type, risk, status):
+    if user == ALL_USERS:
+        return db.query_all_users(limit=limit, cursor=cursor, alert_type=alert_type, risk=risk, status=status)
+    return db.query_alerts(limit=limit, cursor=cursor, alert_type=alert_type, risk=risk, status=status, user=user)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_dashboard_stats(user, store_version, day):
+    if user != ALL_USERS:
+        return db.get_dashboard_stats(user=user)
+    per_user = [db.get_dashboard_stats(user=u) for u in db.list_users()]
+    last_seen = {}
+    for stats in per_user:
+        for alert_type, ts in stats["last_seen"].items():
+            last_seen[alert_type] = max(filter(None, (ts, last_seen.get(alert_type))), default=None)
+    by_type = {}
+    for stats in per_user:
+        for alert_type, count in stats["by_type"].items():
+            by_type[alert_type] = by_type.get(alert_type, 0) + count
+    return {
+        "total": sum(stats["total"] for stats in per_user),
+        "today": sum(stats["today"] for stats in per_user),
+        "by_type": by_type,
+        "last_seen": last_seen,
+    }
+
+def users_version(user):
+    """Cache key for a user's data (every shard's version for ALL_USERS)."""
+    if user == ALL_USERS:
+        return tuple(db.store_version(u) for u in db.list_users())
+    return db.store_version(user)
+
 def main():
+    shared_resources()
+    
     st.title("🛡️ SafeEcho")
     st.caption("Your Autonomous Digital Guardian")
 
@@ -81,7 +156,7 @@ def main():
                 st.audio(audio_value)
                 
                 with st.spinner(f"Listening & Translating ({lang})..."):
-                    result = guardian.analyze_audio(audio_value, language=lang)
+                    result = guardian.analyze_audio(audio_value, language=lang, session=speech.get_session("browser-mic"))
                 
                 # Display Results
                 if "content_analysis" in result:
@@ -99,6 +174,10 @@ def main():
                     else:
                         st.success("✅ **Audio seems Safe**")
                         st.write(f"**Reason:** {result['reason']}")
+                    
+                    voice = result.get("deepfake") or {}
+                    if voice.get("confidence") is not None:
+                        st.caption(f"🎙️ Voice check: {voice['confidence']}% likely computer-generated")
 
         else:
             # Continuous Mode
@@ -106,9 +185,7 @@ def main():
             
             if st.button("Start Monitoring"):
                 import speech_recognition as sr
-                r = sr.Recognizer()
-                r.energy_threshold = 300
-                r.dynamic_energy_threshold = True
+                session = speech.get_session("local-mic")
                 
                 status_placeholder = st.empty()
                 transcript_placeholder = st.empty()
@@ -117,17 +194,20 @@ def main():
                 full_transcript = []
                 
                 with sr.Microphone() as source:
-                    status_placeholder.warning("Adjusting for ambient noise... Please wait.")
-                    r.adjust_for_ambient_noise(source, duration=1)
+                    # Calibrates once per session; later runs reuse the noise profile
+                    if session.noise_floor is None:
+                        status_placeholder.warning("Adjusting for ambient noise... Please wait.")
+                    session.calibrate(source, duration=1)
                     status_placeholder.success("Listening... (Refresh page to stop)")
                     
-                    while True:
-                        try:
-                            # Listen for a phrase
-                            audio_chunk = r.listen(source, phrase_time_limit=5)
-                            
-                            # Analyze
-                            result = guardian.analyze_audio(audio_chunk, language=lang)
+                    # Capture, transcription and classification run concurrently;
+                    # results arrive here in the order they were spoken
+                    monitor = LiveMonitor(session, source, language=lang, phrase_time_limit=5).start()
+                    try:
+                        for result in monitor.results():
+                            if "error" in result:
+                                status_placeholder.error(f"Error: {result['error']}")
+                                break
                             
                             if "content_analysis" in result:
                                 ca = result["content_analysis"]
@@ -140,10 +220,8 @@ def main():
                                         alert_placeholder.error(f"🚨 SCAM DETECTED: {result['reason']}")
                                     else:
                                         alert_placeholder.success(f"✅ Safe: {result['reason']}")
-                                        
-                        except Exception as e:
-                            status_placeholder.error(f"Error: {e}")
-                            break
+                    finally:
+                        monitor.stop()
 
     with tab3:
         st.header("🔍 Manual Message Analysis")
@@ -154,8 +232,6 @@ def main():
         if st.button("Analyze Text"):
             if user_text:
                 with st.spinner("Analyzing patterns..."):
-                    import time
-                    time.sleep(1)
                     result = guardian.analyze_text(user_text)
                 
                 if result["is_scam"]:
@@ -173,27 +249,69 @@ def main():
 
     with tab5:
         st.header("Caregiver Dashboard")
-        st.markdown("### 👵 Protected User: **Grandma Alice**")
+        users = db.list_users()
+        user = st.selectbox("👵 Protected User", users + [ALL_USERS] if len(users) > 1 else users)
         
-        # Metrics
+        # Metrics (read from the store's rolling aggregates)
+        version = users_version(user)
+        stats = cached_dashboard_stats(user, version, datetime.now().date().isoformat())
         m1, m2, m3 = st.columns(3)
-        m1.metric("Threats Blocked", "12", "+2 today")
-        m2.metric("Scam Calls", "5", "Last: 2h ago")
+        m1.metric("Threats Blocked", stats["total"], f"+{stats['today']} today")
+        m2.metric("Scam Calls", stats["by_type"].get("Audio Call", 0),
+                  f"Last: {time_ago(stats['last_seen'].get('Audio Call'))}", delta_color="off")
         m3.metric("System Status", "Active", "Online")
         
         st.divider()
         
         st.subheader("🚨 Recent Alert Log")
         
-        # Fetch Real Data from DB
-        real_data = db.get_alerts()
+        # Filters
+        f1, f2, f3 = st.columns(3)
+        type_filter = f1.selectbox("Type", ["All", "SMS/Text", "Audio Call"])
+        risk_filter = f2.selectbox("Risk", ["All", "High", "Medium", "Low"])
+        status_filter = f3.selectbox("Status", ["All", "Blocked", "Quarantined", "Flagged", db.CONFIRMED_STATUS])
+        
+        filters = {
+            "alert_type": None if type_filter == "All" else type_filter,
+            "risk": None if risk_filter == "All" else risk_filter,
+            "status": None if status_filter == "All" else status_filter,
+        }
+        
+        # Page cursors (newest page first); reset whenever the user or filters change
+        if st.session_state.get("alert_filters") != (user, filters):
+            st.session_state["alert_filters"] = (user, filters)
+            st.session_state["alert_cursors"] = [None]
+        cursors = st.session_state["alert_cursors"]
+        
+        # Fetch one page of Real Data from DB
+        real_data, next_cursor = cached_alert_page(user, version, ALERT_PAGE_SIZE, cursors[-1], **filters)
         
         if real_data:
-            st.table(real_data)
+            # One row per alert; confirming a scam feeds retraining and the reputation index
+            for alert in real_data:
+                owner = alert.get("User", user)
+                c1, c2 = st.columns([4, 1])
+                who = f" · {owner}" if "User" in alert else ""
+                c1.markdown(f"**{alert['Time']}** · {alert['Type']} · {alert['Risk']} · {alert['Status']}{who}  \n"
+                            f"{alert['Details']}")
+                if alert["Status"] == db.CONFIRMED_STATUS:
+                    c2.caption("✅ Confirmed")
+                elif c2.button("Confirm scam", key=f"confirm-{owner}-{alert['Id']}"):
+                    if db.confirm_alert(alert["Id"], user=owner):
+                        reputation.record_confirmed(alert["Id"], user=owner)
+                        st.rerun()
+                    st.warning("This alert is archived and can no longer be changed.")
         else:
             st.info("No alerts recorded yet. System is monitoring...")
         
-        if st.button("🔄 Refresh Data"):
+        p1, p2, p3 = st.columns(3)
+        if p1.button("⬅️ Newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        if p2.button("🔄 Refresh Data"):
+            st.rerun()
+        if p3.button("Older ➡️", disabled=next_cursor is None):
+            cursors.append(next_cursor)
             st.rerun()
         
         st.caption("Connected to SafeEcho Cloud (Simulated)")
@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import guardian
+import telemetry
+
+# In-flight limits per stage. Speech-to-text and translation wait on the
+# network, so many can overlap; scoring is CPU-bound and gets a small pool.
+STT_CONCURRENCY = 64
+TRANSLATE_CONCURRENCY = 64
+SCORING_WORKERS = os.cpu_count() or 4
+
+# Per-stage timeouts (s)
+STT_TIMEOUT = 15.0
+TRANSLATE_TIMEOUT = 5.0
+SCORING_TIMEOUT = 5.0
+
+
+class AsyncGuardian:
+    """
+    asyncio front end to the guardian pipeline.
+
+    Each stage runs on an executor behind its own semaphore, so hundreds of
+    monitored calls can be in flight on one event loop while at most
+    STT_CONCURRENCY transcriptions, TRANSLATE_CONCURRENCY translations and
+    SCORING_WORKERS classifications run at once.
+
+    Cancelling a call (the caller hung up) or hitting a stage timeout
+    releases its slot immediately; work still queued for that call is
+    dropped and its later stages never run.
+    """
+
+    def __init__(self, stt_concurrency=STT_CONCURRENCY, translate_concurrency=TRANSLATE_CONCURRENCY,
+                 scoring_workers=SCORING_WORKERS, stt_timeout=STT_TIMEOUT,
+                 translate_timeout=TRANSLATE_TIMEOUT, scoring_timeout=SCORING_TIMEOUT):
+        self.timeouts = {
+            "speech_to_text": stt_timeout,
+            "translate": translate_timeout,
+            "score": scoring_timeout,
+        }
+        self._limits = {
+            "speech_to_text": asyncio.Semaphore(stt_concurrency),
+            "translate": asyncio.Semaphore(translate_concurrency),
+            "score": asyncio.Semaphore(scoring_workers),
+        }
+        self._io_pool = ThreadPoolExecutor(max_workers=stt_concurrency + translate_concurrency,
+                                           thread_name_prefix="guardian-io")
+        self._cpu_pool = ThreadPoolExecutor(max_workers=scoring_workers, thread_name_prefix="guardian-score")
+
+    async def _run(self, stage, fn, *args):
+        """Run fn(*args) for one stage within its concurrency limit and timeout."""
+        pool = self._cpu_pool if stage == "score" else self._io_pool
+        async with self._limits[stage]:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(pool, functools.partial(fn, *args))
+            try:
+                return await asyncio.wait_for(future, self.timeouts[stage])
+            except asyncio.TimeoutError:
+                telemetry.inc("safeecho_errors_total", stage=stage, error="timeout")
+                raise
+            except asyncio.CancelledError:
+                telemetry.inc("safeecho_async_cancelled_total", stage=stage)
+                raise
+
+    async def analyze_text(self, text, context=None):
+        return await self._run("score", guardian.analyze_text, text, context)
+
+    async def analyze_texts(self, texts, contexts=None):
+        return await self._run("score", guardian.analyze_texts, list(texts), contexts)
+
+    async def analyze_audio(self, audio_file, language="English", context=None, session=None, voice=None):
+        """
+        Async guardian.analyze_audio. A speech-to-text timeout counts as
+        unintelligible audio; a translation timeout falls back to the
+        original transcript, as in the blocking version.
+        """
+        started = time.perf_counter()
+        timings = telemetry.timings_for(context)
+
+        # 1. Speech-to-text (network)
+        audio_data = None
+        try:
+            audio_data, original_text, error = await self._run("speech_to_text", guardian.load_and_transcribe,
+                                                               audio_file, language, timings, session)
+        except asyncio.TimeoutError:
+            original_text, error = None, "Speech API Error: timed out"
+
+        # 2. Translation (network)
+        english_text = error
+        if original_text is not None:
+            try:
+                english_text = await self._run("translate", guardian.translate_transcript,
+                                               original_text, language, timings)
+            except asyncio.TimeoutError:
+                english_text = original_text
+
+        # 3. Scoring and voice screening (CPU)
+        return await self._run("score", guardian.score_audio, original_text, english_text,
+                               context, timings, started, audio_data, voice)
+
+    def close(self):
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_guardian = None
+
+def get_async_guardian():
+    """The shared AsyncGuardian (create it from inside the event loop)."""
+    global _guardian
+    if _guardian is None:
+        _guardian = AsyncGuardian()
+    return _guardian
+
+async def analyze_text(text, context=None):
+    return await get_async_guardian().analyze_text(text, context)
+
+async def analyze_texts(texts, contexts=None):
+    return await get_async_guardian().analyze_texts(texts, contexts)
+
+async def analyze_audio(audio_file, language="English", context=None, session=None, voice=None):
+    return await get_async_guardian().analyze_audio(audio_file, language, context, session, voice)
@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+import db
+from corpus import load_corpus
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# Regression gate: a benchmark fails when its p95 latency grows, or its
+# throughput drops, by more than this fraction relative to the baseline,
+# and the per-item time grows by more than MIN_DELTA_MS (sub-millisecond
+# stages jitter by more than 20% from run to run).
+DEFAULT_THRESHOLD = 0.20
+MIN_DELTA_MS = 0.5
+
+# Each benchmark runs this many times; the median of every metric is reported.
+DEFAULT_REPEATS = 3
+
+# Share of messages drawn from a small pool of repeated "campaign" texts,
+# the way bulk scam SMS arrive word for word.
+CAMPAIGN_RATE = 0.3
+CAMPAIGN_SIZE = 20
+
+AUDIO_LANGUAGES = ["English", "English", "Hindi", "Marathi"]
+BATCH_SIZE = 64
+
+
+def message_mix(n, seed=42):
+    """n (text, context) pairs sampled from the bundled corpora."""
+    corpus = load_corpus()
+    texts = corpus['text'].tolist()
+    rng = random.Random(seed)
+    campaign = rng.sample(corpus[corpus['label'] == 'scam']['text'].tolist(), CAMPAIGN_SIZE)
+    mix = []
+    for _ in range(n):
+        text = rng.choice(campaign) if rng.random() < CAMPAIGN_RATE else rng.choice(texts)
+        mix.append((text, {"is_saved_contact": rng.random() < 0.3}))
+    return mix
+
+def summarize(latencies, wall_seconds, n_items):
+    """Latency percentiles (ms) and throughput (items/s)."""
+    ms = np.asarray(latencies) * 1000
+    return {
+        "n": n_items,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "throughput_per_s": n_items / wall_seconds if wall_seconds else 0.0,
+    }
+
+def run_timed(fn, items, warmup=20, reset=None):
+    """
+    Calls fn(item) for every item; returns per-call latencies and wall time.
+    reset() runs between warmup and measurement (e.g. to empty caches).
+    """
+    for item in items[:warmup]:
+        fn(item)
+    if reset:
+        reset()
+    latencies = []
+    started = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - started
+
+def peak_alloc_kb(fn, items):
+    """Peak Python allocation (KiB) while running fn over items, via tracemalloc."""
+    tracemalloc.start()
+    try:
+        for item in items:
+            fn(item)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def local_speech_stack(transcripts, stt_delay=0.0, translate_delay=0.0):
+    """
+    Replaces Google speech-to-text and translation with local stand-ins:
+    the offline STT backend (serving the given (clip, transcript) pairs) and
+    a translator that returns the text unchanged. Optional delays simulate
+    network round trips.
+    """
+    import speech
+    import translation
+
+    class StandInClient:
+        def __init__(self, source='auto', target='en'):
+            pass
+
+        def translate(self, text):
+            if translate_delay:
+                time.sleep(translate_delay)
+            return text
+
+    original_translator = translation.get_translator()
+    translation.set_translator(translation.Translator(cache_path=None, client_factory=StandInClient))
+    speech.reset_sessions()
+    speech.get_session(backend=speech.OfflineSpeechBackend(transcripts, latency=stt_delay))
+    try:
+        yield
+    finally:
+        translation.set_translator(original_translator)
+        speech.reset_sessions()
+
+def make_audio_clips(texts, seconds=1.0, sample_rate=16000):
+    """Silent 16-bit mono clips, each tagged so its fingerprint is unique; returns clips and (clip, text) pairs."""
+    import speech_recognition as sr
+    silence = bytes(int(seconds * sample_rate) * 2)
+    clips = []
+    for i in range(len(texts)):
+        tag = i.to_bytes(8, 'little')
+        clips.append(sr.AudioData(silence + tag, sample_rate, 2))
+    return clips, list(zip(clips, texts))
+
+
+def _reset_verdict_cache():
+    import guardian
+    guardian.verdict_cache.clear()
+    guardian.verdict_cache.hits = guardian.verdict_cache.misses = 0
+
+def reset_state():
+    """Empty the state that analyze_* calls build up, so every run starts alike."""
+    import reputation
+    _reset_verdict_cache()
+    reputation.set_index(reputation.ReputationIndex())
+
+def median_results(runs):
+    """Median of every numeric metric over repeated runs of one benchmark."""
+    merged = {}
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            merged[key] = float(np.median([r[key] for r in runs]))
+        else:
+            merged[key] = runs[-1][key]
+    merged["repeats"] = len(runs)
+    return merged
+
+def bench_analyze_text(mix):
+    import guardian
+    fn = lambda item: guardian.analyze_text(item[0], item[1])
+    latencies, wall = run_timed(fn, mix, reset=_reset_verdict_cache)
+    result = summarize(latencies, wall, len(mix))
+    result["cache"] = guardian.cache_stats()
+    result["peak_alloc_kb"] = peak_alloc_kb(fn, mix[:200])
+    return result
+
+def bench_analyze_texts(mix):
+    import guardian
+    batches = [mix[i:i + BATCH_SIZE] for i in range(0, len(mix), BATCH_SIZE)]
+    fn = lambda batch: guardian.analyze_texts([t for t, _ in batch], [c for _, c in batch])
+    latencies, wall = run_timed(fn, batches, warmup=2, reset=_reset_verdict_cache)
+    result = summarize(latencies, wall, len(mix))
+    result["batch_size"] = BATCH_SIZE
+    result["peak_alloc_kb"] = peak_alloc_kb(fn, batches[:4])
+    return result
+
+def bench_analyze_audio(mix, stt_delay=0.0, translate_delay=0.0):
+    import guardian
+    clips, transcripts = make_audio_clips([text for text, _ in mix])
+    calls = [(clip, AUDIO_LANGUAGES[i % len(AUDIO_LANGUAGES)], context)
+             for i, (clip, (_, context)) in enumerate(zip(clips, mix))]
+    fn = lambda call: guardian.analyze_audio(call[0], language=call[1], context=call[2])
+    with local_speech_stack(transcripts, stt_delay, translate_delay), open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        latencies, wall = run_timed(fn, calls, reset=_reset_verdict_cache)
+        peak = peak_alloc_kb(fn, calls[:100])
+    result = summarize(latencies, wall, len(calls))
+    result["peak_alloc_kb"] = peak
+    return result
+
+def bench_log_alert(n):
+    alerts = [("SMS/Text", "High", f"Benchmark alert {i}", "Quarantined") for i in range(n)]
+    fn = lambda alert: db.log_alert(*alert)
+    latencies, wall = run_timed(fn, alerts)
+    t0 = time.perf_counter()
+    db.flush()
+    wall += time.perf_counter() - t0
+    result = summarize(latencies, wall, len(alerts))
+    result["peak_alloc_kb"] = peak_alloc_kb(fn, alerts[:1000])
+    db.flush()
+    return result
+
+
+def compare(results, baseline, threshold, min_delta_ms=MIN_DELTA_MS):
+    """List of regression messages against a baseline results dict."""
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        if (current["p95_ms"] > previous["p95_ms"] * (1 + threshold)
+                and current["p95_ms"] - previous["p95_ms"] > min_delta_ms):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.3f} -> {current['p95_ms']:.3f} ms")
+        # Throughput as time per item, so the same absolute floor applies
+        per_item = lambda r: 1000 / r["throughput_per_s"] if r["throughput_per_s"] else float("inf")
+        if (current["throughput_per_s"] < previous["throughput_per_s"] * (1 - threshold)
+                and per_item(current) - per_item(previous) > min_delta_ms):
+            regressions.append(f"{name}: throughput {previous['throughput_per_s']:.1f} -> "
+                               f"{current['throughput_per_s']:.1f} /s")
+    return regressions
+
+def run(n_messages=2000, n_alerts=5000, stt_delay=0.0, translate_delay=0.0, only=None,
+        repeats=DEFAULT_REPEATS):
+    """Runs the suite against a throwaway alert store and returns the results dict."""
+    store_dir = tempfile.mkdtemp(prefix="safeecho-bench-")
+    db.STORE_FILE = os.path.join(store_dir, "alerts.db")
+    db.DB_FILE = None
+
+    mix = message_mix(n_messages)
+    suite = {
+        "analyze_text": lambda: bench_analyze_text(mix),
+        "analyze_texts": lambda: bench_analyze_texts(mix),
+        "analyze_audio": lambda: bench_analyze_audio(mix[:500], stt_delay, translate_delay),
+        "log_alert": lambda: bench_log_alert(n_alerts),
+    }
+
+    benchmarks = {}
+    for name, bench in suite.items():
+        if only and name not in only:
+            continue
+        print(f"Running {name}...")
+        runs = []
+        for _ in range(max(1, repeats)):
+            reset_state()
+            runs.append(bench())
+        benchmarks[name] = median_results(runs)
+    db.flush()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "messages": n_messages,
+            "alerts": n_alerts,
+            "stt_delay": stt_delay,
+            "translate_delay": translate_delay,
+            "repeats": max(1, repeats),
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1),
+        },
+        "benchmarks": benchmarks,
+    }
+
+def print_report(results):
+    print(f"\n{'benchmark':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>10} {'peak KiB':>9}")
+    for name, r in results["benchmarks"].items():
+        print(f"{name:<16} {r['p50_ms']:9.3f} {r['p95_ms']:9.3f} {r['p99_ms']:9.3f} "
+              f"{r['throughput_per_s']:10.1f} {r['peak_alloc_kb']:9.0f}")
+    print(f"Process max RSS: {results['meta']['max_rss_kb'] / 1024:.1f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmarks for the guardian pipeline.")
+    parser.add_argument("--messages", type=int, default=2000, help="messages per text benchmark")
+    parser.add_argument("--alerts", type=int, default=5000, help="alerts for the log_alert benchmark")
+    parser.add_argument("--stt-delay", type=float, default=0.0, help="simulated speech-to-text latency (s)")
+    parser.add_argument("--translate-delay", type=float, default=0.0, help="simulated translation latency (s)")
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help="runs per benchmark (the median is reported)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to save the JSON results")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed regression as a fraction (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA_MS,
+                        help="ignore regressions smaller than this per item (ms)")
+    args = parser.parse_args()
+
+    results = run(args.messages, args.alerts, args.stt_delay, args.translate_delay, args.only, args.repeats)
+    print_report(results)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"❌ Regressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("✅ No regressions against baseline.")
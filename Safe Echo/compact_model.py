@@ -0,0 +1,178 @@
+import hashlib
+import json
+import re
+from collections import Counter
+
+import numpy as np
+
+# Features whose |weight| is below this are dropped from the weight vector
+PRUNE_THRESHOLD = 0.02
+
+# Pruned terms still count towards each message's L2 norm (dropping them
+# shifts every score). They are kept as 32-bit hashes with an 8-bit idf.
+NORM_IDF_LEVELS = 255
+
+
+def term_hash(term):
+    """Stable 64-bit hash of a vocabulary term."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CompactModel:
+    """
+    Pruned stand-in for a TfidfVectorizer + linear classifier pipeline
+    (SGDClassifier with log_loss, or LogisticRegression) with the same
+    classes_ / predict_proba interface.
+
+    The vocabulary dict is replaced by sorted uint64 term hashes looked up
+    with np.searchsorted; weights and idf are float32 arrays over the kept
+    terms only.
+    """
+
+    def __init__(self, classes, intercept, terms, weights, idf, norm_terms, norm_idf, settings):
+        self.classes_ = np.asarray(classes)
+        self.intercept = float(intercept)
+        self.terms = terms
+        self.weights = weights
+        self.idf = idf
+        self.norm_terms = norm_terms
+        self.norm_idf = norm_idf
+        self.settings = settings
+        self._token = re.compile(settings["token_pattern"])
+
+    # Building
+    @classmethod
+    def from_pipeline(cls, pipeline, threshold=PRUNE_THRESHOLD):
+        vectorizer, classifier = pipeline[0], pipeline[-1]
+        params = vectorizer.get_params()
+        if not hasattr(vectorizer, "vocabulary_") or not hasattr(vectorizer, "idf_"):
+            raise ValueError("compact export needs a fitted TfidfVectorizer")
+        if (params["analyzer"] != "word" or params["tokenizer"] or params["preprocessor"]
+                or params["stop_words"] or params["strip_accents"] or params["norm"] not in ("l2", None)):
+            raise ValueError("compact export supports word n-grams with the default preprocessing only")
+        if getattr(classifier, "coef_", None) is None or classifier.coef_.shape[0] != 1:
+            raise ValueError("compact export needs a binary linear classifier")
+        if getattr(classifier, "loss", "log_loss") != "log_loss":
+            raise ValueError("compact export needs a classifier with logistic probabilities")
+
+        names = vectorizer.get_feature_names_out()
+        weights = classifier.coef_[0]
+        idf = vectorizer.idf_
+        hashes = np.array([term_hash(name) for name in names], dtype=np.uint64)
+        if len(np.unique(hashes)) != len(hashes):
+            raise ValueError("term hash collision in the vocabulary")
+
+        keep = np.abs(weights) >= threshold
+        if not keep.any():
+            raise ValueError(f"no feature weight reaches the prune threshold {threshold}")
+        order = np.argsort(hashes[keep])
+        terms = hashes[keep][order]
+
+        # Norm-only terms: low 32 bits of the hash, idf quantized to a byte
+        dropped_idf = idf[~keep]
+        lo, hi = (float(dropped_idf.min()), float(dropped_idf.max())) if dropped_idf.size else (1.0, 1.0)
+        step = (hi - lo) / NORM_IDF_LEVELS or 1.0
+        norm_terms, first = np.unique((hashes[~keep] & 0xFFFFFFFF).astype(np.uint32), return_index=True)
+        norm_idf = np.round((dropped_idf[first] - lo) / step).astype(np.uint8)
+
+        settings = {
+            "token_pattern": params["token_pattern"],
+            "lowercase": params["lowercase"],
+            "ngram_range": list(params["ngram_range"]),
+            "binary": params["binary"],
+            "sublinear_tf": params["sublinear_tf"],
+            "use_idf": params["use_idf"],
+            "norm": params["norm"],
+            "norm_idf_range": [lo, step],
+            "threshold": threshold,
+            "vocabulary_size": len(names),
+        }
+        model = cls(classifier.classes_, classifier.intercept_[0], terms,
+                    weights[keep][order].astype(np.float32), idf[keep][order].astype(np.float32),
+                    norm_terms, norm_idf, settings)
+        if "scam" not in list(model.classes_):
+            raise ValueError("classifier has no 'scam' class")
+        return model
+
+    # Persistence
+    def save(self, f):
+        """Write the model to a path or binary file object (.npz)."""
+        np.savez_compressed(f, classes=self.classes_.astype(str), intercept=np.float64(self.intercept),
+                            terms=self.terms, weights=self.weights, idf=self.idf,
+                            norm_terms=self.norm_terms, norm_idf=self.norm_idf,
+                            settings=np.array(json.dumps(self.settings)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["classes"], data["intercept"], data["terms"], data["weights"], data["idf"],
+                       data["norm_terms"], data["norm_idf"], json.loads(str(data["settings"])))
+
+    @property
+    def n_features(self):
+        return len(self.terms)
+
+    # Scoring
+    def _ngrams(self, text):
+        if self.settings["lowercase"]:
+            text = text.lower()
+        tokens = self._token.findall(text)
+        lo, hi = self.settings["ngram_range"]
+        grams = []
+        for n in range(lo, hi + 1):
+            if n == 1:
+                grams.extend(tokens)
+            else:
+                grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def _tf(self, counts):
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.settings["binary"]:
+            return np.ones_like(tf)
+        if self.settings["sublinear_tf"]:
+            return 1 + np.log(tf)
+        return tf
+
+    def decision_function(self, texts):
+        """Logit of classes_[1] for each text (as in the full classifier)."""
+        use_idf = self.settings["use_idf"]
+        lo, step = self.settings["norm_idf_range"]
+        scores = np.empty(len(texts))
+        for i, text in enumerate(texts):
+            counts = Counter(self._ngrams(text))
+            if not counts:
+                scores[i] = self.intercept
+                continue
+            hashes = np.fromiter((term_hash(g) for g in counts), dtype=np.uint64, count=len(counts))
+            tf = self._tf(counts)
+
+            # Kept terms
+            pos = np.minimum(np.searchsorted(self.terms, hashes), len(self.terms) - 1)
+            hit = self.terms[pos] == hashes
+            x = tf[hit] * (self.idf[pos[hit]] if use_idf else 1.0)
+            score = float(x @ self.weights[pos[hit]])
+
+            if self.settings["norm"] == "l2":
+                # Pruned terms only add to the norm
+                rest = (hashes[~hit] & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+                npos = np.minimum(np.searchsorted(self.norm_terms, rest), max(len(self.norm_terms) - 1, 0))
+                nhit = self.norm_terms[npos] == rest if len(self.norm_terms) else np.zeros(len(rest), bool)
+                rest_x = tf[~hit][nhit] * ((lo + step * self.norm_idf[npos[nhit]]) if use_idf else 1.0)
+                norm = np.sqrt(x @ x + rest_x @ rest_x)
+                if norm:
+                    score /= norm
+            scores[i] = score + self.intercept
+        return scores
+
+    def predict_proba(self, texts):
+        """(n, 2) class probabilities, columns in classes_ order."""
+        p = 1 / (1 + np.exp(-self.decision_function(list(texts))))
+        return np.column_stack((1 - p, p))
+
+    def predict(self, texts):
+        return self.classes_[np.argmax(self.predict_proba(texts), axis=1)]
+
+
+def load(path):
+    return CompactModel.load(path)
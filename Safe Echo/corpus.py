@@ -0,0 +1,183 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Preprocessed corpus cache, keyed on a hash of the source files
+CACHE_DIR = os.path.join(BASE_DIR, ".corpus_cache")
+CACHE_PREFIX = "corpus-"
+
+CHUNK_SIZE = 2000
+
+# URL/EMAIL/PHONE flags: 1 = present, 0 = absent, -1 = not labelled by the source
+FLAG_COLUMNS = ("url", "email", "phone")
+
+LABEL_MAP = {
+    'fraud': 'scam',
+    'normal': 'safe',
+    'spam': 'scam',
+    'smishing': 'scam',
+    'ham': 'safe',
+}
+
+
+def _map_labels(df):
+    df['label'] = df['label'].astype(str).str.strip().str.lower().map(LABEL_MAP)
+    df['text'] = df['text'].astype(str)
+    return df.dropna(subset=['label'])
+
+def _with_flags(df, flags=None):
+    for column in FLAG_COLUMNS:
+        df[column] = -1 if flags is None else flags[column]
+    return df
+
+def read_fraud_calls(path, chunksize=CHUNK_SIZE):
+    """fraud_call.file: tab-separated 'fraud'/'normal' <TAB> text, no header."""
+    reader = pd.read_csv(path, sep='\t', header=None, names=['label', 'text'],
+                         on_bad_lines='skip', chunksize=chunksize)
+    for chunk in reader:
+        yield _with_flags(_map_labels(chunk))
+
+def read_new_scams(path, chunksize=CHUNK_SIZE):
+    """new_scams.csv: 'fraud',text with no header and unquoted commas in the text."""
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            # Messages contain unquoted commas, so split each line on the first one only
+            label, _, text = line.rstrip('\n').partition(',')
+            rows.append((label, text))
+            if len(rows) >= chunksize:
+                yield _with_flags(_map_labels(pd.DataFrame(rows, columns=['label', 'text'])))
+                rows = []
+    if rows:
+        yield _with_flags(_map_labels(pd.DataFrame(rows, columns=['label', 'text'])))
+
+def read_spam_collection(path, chunksize=CHUNK_SIZE):
+    """spam.csv: SMS Spam Collection, columns v1 (ham/spam), v2 (text), latin-1."""
+    reader = pd.read_csv(path, encoding='latin-1', usecols=['v1', 'v2'], chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.rename(columns={'v1': 'label', 'v2': 'text'})
+        yield _with_flags(_map_labels(chunk))
+
+def read_smishing_dataset(path, chunksize=CHUNK_SIZE):
+    """Dataset_5971.csv: LABEL (ham/spam/smishing), TEXT and Yes/No URL, EMAIL, PHONE flags."""
+    reader = pd.read_csv(path, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.rename(columns={'LABEL': 'label', 'TEXT': 'text'})
+        flags = {
+            column: (chunk[column.upper()].astype(str).str.strip().str.lower() == 'yes').astype(np.int8)
+            for column in FLAG_COLUMNS
+        }
+        yield _map_labels(_with_flags(chunk[['label', 'text']].copy(), flags))
+
+# (name, file, reader), in priority order: when the same text appears in
+# several sources, the first one's label wins.
+SOURCES = [
+    ("fraud_call", "fraud_call.file", read_fraud_calls),
+    ("new_scams", "new_scams.csv", read_new_scams),
+    ("smishing", "Dataset_5971.csv", read_smishing_dataset),
+    ("spam", "spam.csv", read_spam_collection),
+]
+
+
+def text_hash(text):
+    """64-bit hash of a message, insensitive to case and spacing."""
+    normalized = " ".join(text.lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _source_path(filename, base_dir):
+    return filename if os.path.isabs(filename) else os.path.join(base_dir, filename)
+
+def iter_corpus(sources=None, base_dir=BASE_DIR, chunksize=CHUNK_SIZE):
+    """
+    Streams every source in chunks as DataFrames with columns
+    text, label ('scam'/'safe'), source and the URL/EMAIL/PHONE flags.
+    Duplicate texts (by text_hash) are dropped across all sources.
+    """
+    seen = set()
+    for name, filename, reader in sources or SOURCES:
+        path = _source_path(filename, base_dir)
+        if not os.path.exists(path):
+            print(f"Corpus source '{name}' not found at {path}, skipping.")
+            continue
+        for chunk in reader(path, chunksize):
+            hashes = chunk['text'].map(text_hash)
+            keep = ~hashes.duplicated() & ~hashes.isin(seen)
+            seen.update(hashes[keep])
+            chunk = chunk[keep]
+            if not chunk.empty:
+                chunk = chunk.assign(source=name)
+                yield chunk[['text', 'label', 'source', *FLAG_COLUMNS]].reset_index(drop=True)
+
+def sources_fingerprint(sources=None, base_dir=BASE_DIR):
+    """Hash over the name and content of every source file."""
+    digest = hashlib.sha256()
+    for name, filename, _ in sources or SOURCES:
+        digest.update(name.encode('utf-8'))
+        path = _source_path(filename, base_dir)
+        if not os.path.exists(path):
+            digest.update(b"<missing>")
+            continue
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+def _save_cache(df, path):
+    """Columnar npz: texts as one UTF-8 blob plus offsets (no pickled objects)."""
+    encoded = [text.encode('utf-8') for text in df['text']]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    tmp = f"{path}.tmp.npz"
+    np.savez_compressed(
+        tmp,
+        text_blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        text_offsets=offsets,
+        label=df['label'].to_numpy(dtype=str),
+        source=df['source'].to_numpy(dtype=str),
+        **{column: df[column].to_numpy(dtype=np.int8) for column in FLAG_COLUMNS}
+    )
+    os.replace(tmp, path)
+
+def _load_cache(path):
+    with np.load(path) as data:
+        blob = data['text_blob'].tobytes()
+        offsets = data['text_offsets']
+        texts = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        df = pd.DataFrame({'text': texts, 'label': data['label'], 'source': data['source']})
+        for column in FLAG_COLUMNS:
+            df[column] = data[column]
+    return df
+
+def load_corpus(sources=None, base_dir=BASE_DIR, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    The full deduplicated corpus as one DataFrame.
+    The first call parses the source files and writes a columnar cache;
+    later calls with unchanged sources load that cache and skip CSV parsing.
+    """
+    path = os.path.join(cache_dir, f"{CACHE_PREFIX}{sources_fingerprint(sources, base_dir)}.npz")
+    if use_cache and os.path.exists(path):
+        try:
+            return _load_cache(path)
+        except Exception as e:
+            print(f"Ignoring unreadable corpus cache {path}: {e}")
+
+    chunks = list(iter_corpus(sources, base_dir))
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=['text', 'label', 'source', *FLAG_COLUMNS])
+    df = df.astype({column: np.int8 for column in FLAG_COLUMNS})
+
+    if use_cache:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            _save_cache(df, path)
+        except OSError as e:
+            print(f"Could not write corpus cache: {e}")
+    return df
@@ -1,48 +1,847 @@
+import contextlib
+import heapq
 import json
 import os
-from datetime import datetime
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 
+try:
+    import fcntl
+except ImportError:  # Windows: rely on SQLite's own locking
+    fcntl = None
+
+from alert_writer import AlertWriter
+from segments import SegmentStore
+
+# Legacy single-file store. Migrated into STORE_FILE on first start.
 DB_FILE = "cloud_db.json"
 
-def init_db():
-    """Initialize the JSON database if it doesn't exist."""
-    if not os.path.exists(DB_FILE):
-        with open(DB_FILE, "w") as f:
-            json.dump([], f)
-
-def log_alert(alert_type, risk_level, details, status="Blocked"):
-    """Log a new alert to the database."""
-    init_db()
-    
-    new_alert = {
-        "Time": datetime.now().strftime("%I:%M %p"),
+# Append-only alert log (SQLite in WAL mode) of the default protected user.
+STORE_FILE = "alerts.db"
+
+# Every other protected user has a shard of their own:
+# <dir of STORE_FILE>/users/<user>/alerts.db (with its own segments/).
+USERS_DIR = "users"
+DEFAULT_USER = "default"
+
+ALERT_FIELDS = ("Time", "Type", "Risk", "Status", "Details", "Timestamp")
+
+# Stored with each alert but not shown in the alert log: the analyzed text,
+# used to fold confirmed scams back into training, and who sent it (for the
+# reputation index).
+STORED_FIELDS = ALERT_FIELDS + ("Message", "Sender")
+
+# Status a caregiver sets on an alert to confirm it as a real scam
+CONFIRMED_STATUS = "Confirmed"
+
+# Time partitioning. The SQLite file is the hot segment: alerts from the last
+# HOT_DAYS days. Older days are sealed by compact() into gzipped JSONL files,
+# segments/alerts-YYYY-MM-DD.jsonl.gz next to the store.
+HOT_DAYS = 7
+
+# Sealed days older than this keep only alerts that keep_when_downsampled()
+# accepts (None: never downsample).
+DOWNSAMPLE_AFTER_DAYS = 90
+
+# Sealed days older than this are deleted (None: keep forever).
+RETENTION_DAYS = 365
+
+# How often the background compactor runs (s)
+COMPACT_INTERVAL = 3600
+
+def keep_when_downsampled(alert):
+    return alert.get("Risk") == "High" or alert.get("Status") == CONFIRMED_STATUS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Time TEXT,
+    Type TEXT,
+    Risk TEXT,
+    Status TEXT,
+    Details TEXT,
+    Timestamp TEXT NOT NULL,
+    Message TEXT,
+    Sender TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (Timestamp);
+CREATE INDEX IF NOT EXISTS idx_alerts_type_ts ON alerts (Type, Timestamp);
+CREATE INDEX IF NOT EXISTS idx_alerts_risk_ts ON alerts (Risk, Timestamp);
+CREATE INDEX IF NOT EXISTS idx_alerts_status_ts ON alerts (Status, Timestamp);
+CREATE TABLE IF NOT EXISTS segments (
+    day TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    min_id INTEGER,
+    max_id INTEGER,
+    downsampled INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS alert_stats (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    last_seen TEXT,
+    PRIMARY KEY (dimension, value)
+);
+"""
+
+# Rolling aggregates kept in alert_stats, updated in the same transaction as
+# each insert: one row per (dimension, value), e.g. ('Type', 'Audio Call'),
+# ('Day', '2024-11-20') or ('All', '').
+STAT_DIMENSIONS = ("Type", "Risk", "Status")
+
+# meta 'version' is bumped in every write transaction, so readers can tell
+# whether anything changed with one primary-key lookup.
+_BUMP_VERSION = """
+INSERT INTO meta (key, value) VALUES ('version', '1')
+ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+"""
+
+_UPSERT_STAT = """
+INSERT INTO alert_stats (dimension, value, count, last_seen) VALUES (?, ?, ?, ?)
+ON CONFLICT (dimension, value) DO UPDATE SET
+    count = count + excluded.count,
+    last_seen = CASE WHEN excluded.last_seen > COALESCE(last_seen, '') THEN excluded.last_seen ELSE last_seen END
+"""
+
+DEFAULT_PAGE_SIZE = 50
+
+_ROW_COLUMNS = "id, Time, Type, Risk, Status, Details, Timestamp"
+
+
+class AlertStore:
+    """
+    Append-only alert log.
+    Each alert is a single INSERT, so logging costs the same no matter how
+    many alerts are already stored. Reads come back newest first; they only
+    open sealed segments when the hot window can't fill the page.
+    """
+
+    def __init__(self, path=STORE_FILE, legacy_path=DB_FILE, segment_dir=None, hot_days=HOT_DAYS,
+                 downsample_after_days=DOWNSAMPLE_AFTER_DAYS, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.segments = SegmentStore(segment_dir or os.path.join(os.path.dirname(os.path.abspath(path)), "segments"))
+        self.hot_days = hot_days
+        self.downsample_after_days = downsample_after_days
+        self.retention_days = retention_days
+        self._write_lock = threading.Lock()
+        self._lock_file = None
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        """One connection per thread; SQLite connections are not shareable."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            self._init_schema(conn)
+        return conn
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Exclusive write lock on this shard: a thread lock plus flock() on
+        <store>.lock, so writers of the same user in other processes queue
+        up here instead of spinning on SQLITE_BUSY.
+        """
+        with self._write_lock:
+            if fcntl is None:
+                yield
+                return
+            if self._lock_file is None:
+                self._lock_file = open(self.path + ".lock", "a")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _init_schema(self, conn):
+        with self._init_lock, self._locked():
+            if self._ready:
+                return
+            conn.executescript(_SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(alerts)")]
+            if "Message" not in columns:
+                conn.execute("ALTER TABLE alerts ADD COLUMN Message TEXT")
+            if "Sender" not in columns:
+                conn.execute("ALTER TABLE alerts ADD COLUMN Sender TEXT")
+            self._migrate_legacy(conn)
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'stats_built'").fetchone() is None:
+                # Store created before aggregates existed
+                self._rebuild_stats(conn)
+            self._ready = True
+
+    def _migrate_legacy(self, conn):
+        """Import the old cloud_db.json once (it is kept on disk untouched)."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'legacy_migrated'").fetchone()
+            if done is None:
+                legacy = []
+                if self.legacy_path and os.path.exists(self.legacy_path):
+                    with open(self.legacy_path, "r") as f:
+                        legacy = json.load(f)
+                # Legacy file is newest first; insert oldest first so ids keep the order
+                self._insert(conn, reversed(legacy))
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)",
+                    (str(len(legacy)),)
+                )
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats_built', '1')")
+            conn.execute(_BUMP_VERSION)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _insert(conn, alerts):
+        rows = [tuple(alert.get(k) for k in STORED_FIELDS) for alert in alerts]
+        conn.executemany(
+            f"INSERT INTO alerts ({', '.join(STORED_FIELDS)}) VALUES ({', '.join('?' * len(STORED_FIELDS))})",
+            rows
+        )
+        AlertStore._count(conn, (dict(zip(STORED_FIELDS, row)) for row in rows))
+        conn.execute(_BUMP_VERSION)
+
+    @staticmethod
+    def _count(conn, alerts, sign=1):
+        """
+        Fold alerts into alert_stats: a handful of upserts per batch, whatever its size.
+        sign=-1 takes removed alerts (downsampled or expired) back out.
+        """
+        deltas = {}
+        for alert in alerts:
+            ts = alert["Timestamp"]
+            keys = [("All", ""), ("Day", ts[:10])]
+            keys += [(dim, alert[dim]) for dim in STAT_DIMENSIONS if alert.get(dim) is not None]
+            for key in keys:
+                count, last = deltas.get(key, (0, ""))
+                deltas[key] = (count + 1, max(last, ts))
+        if sign > 0:
+            conn.executemany(_UPSERT_STAT, [(dim, value, count, last or None)
+                                            for (dim, value), (count, last) in deltas.items()])
+        else:
+            conn.executemany(_UPSERT_STAT, [(dim, value, -count, None)
+                                            for (dim, value), (count, _) in deltas.items()])
+            conn.execute("DELETE FROM alert_stats WHERE count <= 0")
+
+    def _rebuild_stats(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM alert_stats")
+            conn.execute("INSERT INTO alert_stats SELECT 'All', '', COUNT(*), MAX(Timestamp) FROM alerts HAVING COUNT(*) > 0")
+            conn.execute("INSERT INTO alert_stats SELECT 'Day', substr(Timestamp, 1, 10), COUNT(*), MAX(Timestamp) "
+                         "FROM alerts GROUP BY substr(Timestamp, 1, 10)")
+            for dim in STAT_DIMENSIONS:
+                conn.execute(f"INSERT INTO alert_stats SELECT '{dim}', {dim}, COUNT(*), MAX(Timestamp) "
+                             f"FROM alerts WHERE {dim} IS NOT NULL GROUP BY {dim}")
+            for day in self._sealed_days(conn):
+                self._count(conn, self.segments.read(day))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats_built', '1')")
+            conn.execute(_BUMP_VERSION)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def rebuild_stats(self):
+        """Recompute alert_stats from the raw alert log (hot window and retained segments)."""
+        conn = self._connect()
+        with self._locked():
+            self._rebuild_stats(conn)
+
+    def stats(self):
+        """{dimension: {value: (count, last_seen)}} from alert_stats."""
+        conn = self._connect()
+        result = {}
+        for dim, value, count, last_seen in conn.execute("SELECT dimension, value, count, last_seen FROM alert_stats"):
+            result.setdefault(dim, {})[value] = (count, last_seen)
+        return result
+
+    def init(self):
+        self._connect()
+
+    def append(self, alerts):
+        """Append alerts (oldest first) in a single transaction."""
+        conn = self._connect()
+        with self._locked(), conn:
+            self._insert(conn, alerts)
+
+    def fetch_all(self):
+        """All alerts, newest first."""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT Time, Type, Risk, Status, Details, Timestamp FROM alerts ORDER BY id DESC"
+        ).fetchall()
+        alerts = [dict(zip(ALERT_FIELDS, row)) for row in rows]
+        for day in self._sealed_days(conn, descending=True):
+            alerts.extend({k: a.get(k) for k in ALERT_FIELDS} for a in reversed(self.segments.read(day)))
+        return alerts
+
+    def query(self, since=None, until=None, alert_type=None, risk=None, status=None,
+              limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        One page of alerts, newest first, plus the cursor for the next page.
+        Each alert also carries its Id (for confirm_alert()).
+        Every filter maps onto an index ending in Timestamp, and pagination is
+        keyset-based, so a page costs O(limit) regardless of store size.
+        """
+        rows = self.query_rows(since, until, alert_type, risk, status, limit + 1, cursor)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = _encode_cursor(last[6], last[0])
+        return [dict(zip(ALERT_FIELDS, row[1:]), Id=row[0]) for row in rows], next_cursor
+
+    def query_rows(self, since=None, until=None, alert_type=None, risk=None, status=None,
+                   n=DEFAULT_PAGE_SIZE, cursor=None):
+        """Up to n raw (id, *ALERT_FIELDS) rows, newest first (see query())."""
+        clauses = []
+        params = []
+        for column, value in (("Type", alert_type), ("Risk", risk), ("Status", status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("Timestamp >= ?")
+            params.append(_iso(since))
+        if until is not None:
+            clauses.append("Timestamp < ?")
+            params.append(_iso(until))
+        if cursor:
+            cursor_ts, cursor_id = _decode_cursor(cursor)
+            clauses.append("(Timestamp, id) < (?, ?)")
+            params.extend([cursor_ts, cursor_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        rows = conn.execute(
+            f"SELECT {_ROW_COLUMNS} FROM alerts {where} "
+            "ORDER BY Timestamp DESC, id DESC LIMIT ?",
+            params + [n]
+        ).fetchall()
+
+        if len(rows) < n:
+            # Hot window exhausted: continue into sealed days
+            sealed = self._query_sealed(conn, since, until, alert_type, risk, status, n, cursor)
+            if sealed:
+                key = lambda row: (row[6], row[0])
+                rows = list(heapq.merge(rows, sealed, key=key, reverse=True))[:n]
+        return rows
+
+    def _query_sealed(self, conn, since, until, alert_type, risk, status, n, cursor):
+        """Up to n rows from sealed segments, newest first, same filters and keyset as query()."""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("day >= ?")
+            params.append(_iso(since)[:10])
+        if until is not None:
+            clauses.append("day <= ?")
+            params.append(_iso(until)[:10])
+        cursor_key = None
+        if cursor:
+            cursor_ts, cursor_id = _decode_cursor(cursor)
+            cursor_key = (cursor_ts, cursor_id)
+            clauses.append("day <= ?")
+            params.append(cursor_ts[:10])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        days = [row[0] for row in conn.execute(f"SELECT day FROM segments {where} ORDER BY day DESC", params)]
+
+        since_ts = _iso(since) if since is not None else None
+        until_ts = _iso(until) if until is not None else None
+        rows = []
+        for day in days:
+            for a in reversed(self.segments.read(day)):
+                ts = a["Timestamp"]
+                if (alert_type is not None and a.get("Type") != alert_type) or \
+                        (risk is not None and a.get("Risk") != risk) or \
+                        (status is not None and a.get("Status") != status) or \
+                        (since_ts is not None and ts < since_ts) or \
+                        (until_ts is not None and ts >= until_ts) or \
+                        (cursor_key is not None and (ts, a["id"]) >= cursor_key):
+                    continue
+                rows.append((a["id"],) + tuple(a.get(k) for k in ALERT_FIELDS))
+                if len(rows) >= n:
+                    return rows
+        return rows
+
+    def set_status(self, alert_id, status):
+        """Change an alert's status (alerts in sealed segments are read-only)."""
+        conn = self._connect()
+        with self._locked(), conn:
+            row = conn.execute("SELECT Status, Timestamp FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+            if row is None:
+                return False
+            old_status, ts = row
+            conn.execute("UPDATE alerts SET Status = ? WHERE id = ?", (status, alert_id))
+            if old_status != status:
+                if old_status is not None:
+                    conn.execute("UPDATE alert_stats SET count = count - 1 WHERE dimension = 'Status' AND value = ?",
+                                 (old_status,))
+                conn.execute(_UPSERT_STAT, ("Status", status, 1, ts))
+            conn.execute(_BUMP_VERSION)
+        return True
+
+    def message_of(self, alert_id):
+        """(message, sender) of an alert in the hot window, or None."""
+        row = self._connect().execute("SELECT Message, Sender FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+        return tuple(row) if row else None
+
+    def version(self):
+        """Write counter of the store; changes whenever any alert is added or updated."""
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def confirmed_messages(self, after_id=0):
+        """(id, message) of confirmed alerts with id > after_id, oldest first."""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT id, Message FROM alerts WHERE Status = ? AND id > ? AND Message IS NOT NULL ORDER BY id",
+            (CONFIRMED_STATUS, after_id)
+        ).fetchall()
+        days = [row[0] for row in conn.execute("SELECT day FROM segments WHERE max_id > ?", (after_id,))]
+        for day in days:
+            rows.extend((a["id"], a["Message"]) for a in self.segments.read(day)
+                        if a["id"] > after_id and a.get("Status") == CONFIRMED_STATUS and a.get("Message") is not None)
+        return sorted(rows)
+
+    def scam_reports(self, after_id=0, confirmed_only=False):
+        """
+        (id, message, sender) of alerts with id > after_id that count as scam
+        reports (High risk or confirmed; confirmed only if confirmed_only),
+        oldest first.
+        """
+        is_report = lambda a: a.get("Status") == CONFIRMED_STATUS or (not confirmed_only and a.get("Risk") == "High")
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT id, Message, Sender FROM alerts WHERE (Status = ? OR (? = 0 AND Risk = 'High')) AND id > ? ORDER BY id",
+            (CONFIRMED_STATUS, int(confirmed_only), after_id)
+        ).fetchall()
+        days = [row[0] for row in conn.execute("SELECT day FROM segments WHERE max_id > ?", (after_id,))]
+        for day in days:
+            rows.extend((a["id"], a.get("Message"), a.get("Sender")) for a in self.segments.read(day)
+                        if a["id"] > after_id and is_report(a))
+        return sorted(rows)
+
+    # Time partitioning
+    def _sealed_days(self, conn, descending=False):
+        order = "DESC" if descending else "ASC"
+        return [row[0] for row in conn.execute(f"SELECT day FROM segments ORDER BY day {order}")]
+
+    def compact(self, today=None):
+        """
+        Seal hot days older than hot_days, then downsample and expire sealed
+        days per policy. Files are written outside any transaction; the only
+        write lock taken is a short one per day to swap rows for the segment,
+        so writers are never held up by compression.
+        """
+        today = today or date.today()
+        conn = self._connect()
+        summary = {"sealed": 0, "downsampled": 0, "expired": 0}
+
+        boundary = (today - timedelta(days=self.hot_days)).isoformat()
+        days = [row[0] for row in conn.execute(
+            "SELECT DISTINCT substr(Timestamp, 1, 10) FROM alerts WHERE Timestamp < ?", (boundary,))]
+        for day in days:
+            summary["sealed"] += self._seal_day(conn, day)
+
+        if self.downsample_after_days is not None:
+            cutoff = (today - timedelta(days=self.downsample_after_days)).isoformat()
+            for day in [row[0] for row in conn.execute(
+                    "SELECT day FROM segments WHERE downsampled = 0 AND day < ?", (cutoff,))]:
+                summary["downsampled"] += self._downsample_day(conn, day)
+
+        if self.retention_days is not None:
+            cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+            for day in [row[0] for row in conn.execute("SELECT day FROM segments WHERE day < ?", (cutoff,))]:
+                expired = self.segments.read(day)
+                with self._locked(), conn:
+                    conn.execute("DELETE FROM segments WHERE day = ?", (day,))
+                    self._count(conn, expired, sign=-1)
+                    conn.execute(_BUMP_VERSION)
+                self.segments.remove(day)
+                summary["expired"] += 1
+        return summary
+
+    def _seal_day(self, conn, day):
+        """Move one day's alerts from the hot store into its segment. Returns alerts moved."""
+        lo, hi = day, (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+        rows = conn.execute(
+            f"SELECT id, {', '.join(STORED_FIELDS)} FROM alerts WHERE Timestamp >= ? AND Timestamp < ? "
+            "ORDER BY Timestamp, id", (lo, hi)
+        ).fetchall()
+        if not rows:
+            return 0
+        fresh = [dict(zip(("id",) + STORED_FIELDS, row)) for row in rows]
+        # Late alerts for an already sealed day are merged into its segment
+        merged = {a["id"]: a for a in self.segments.read(day)}
+        merged.update((a["id"], a) for a in fresh)
+        alerts = sorted(merged.values(), key=lambda a: (a["Timestamp"], a["id"]))
+
+        tmp = self.segments.write_temp(day, alerts)
+        try:
+            with self._locked():
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    current = conn.execute(
+                        "SELECT id, Status FROM alerts WHERE Timestamp >= ? AND Timestamp < ? ORDER BY Timestamp, id",
+                        (lo, hi)
+                    ).fetchall()
+                    if current != [(a["id"], a["Status"]) for a in fresh]:
+                        # Changed while the segment was written; the next run retries
+                        conn.execute("ROLLBACK")
+                        return 0
+                    conn.execute("DELETE FROM alerts WHERE Timestamp >= ? AND Timestamp < ?", (lo, hi))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO segments (day, count, min_id, max_id, downsampled) VALUES (?, ?, ?, ?, 0)",
+                        (day, len(alerts), min(merged), max(merged))
+                    )
+                    conn.execute(_BUMP_VERSION)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                self.segments.install(day, tmp)
+        finally:
+            self.segments.discard(tmp)
+        return len(fresh)
+
+    def _downsample_day(self, conn, day):
+        alerts = self.segments.read(day)
+        kept = [a for a in alerts if keep_when_downsampled(a)]
+        tmp = self.segments.write_temp(day, kept)
+        try:
+            with self._locked():
+                with conn:
+                    conn.execute("UPDATE segments SET count = ?, downsampled = 1 WHERE day = ?", (len(kept), day))
+                    self._count(conn, [a for a in alerts if not keep_when_downsampled(a)], sign=-1)
+                    if kept:
+                        conn.execute("UPDATE alert_stats SET last_seen = ? WHERE dimension = 'Day' AND value = ?",
+                                     (max(a["Timestamp"] for a in kept), day))
+                    conn.execute(_BUMP_VERSION)
+                self.segments.install(day, tmp)
+        finally:
+            self.segments.discard(tmp)
+        return len(alerts) - len(kept)
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _encode_cursor(timestamp, alert_id):
+    return f"{timestamp}|{alert_id}"
+
+def _decode_cursor(cursor):
+    timestamp, _, alert_id = cursor.rpartition("|")
+    return timestamp, int(alert_id)
+
+
+def user_key(user):
+    """Shard key of a protected user: lowercase, filesystem-safe (None -> DEFAULT_USER)."""
+    if user is None:
+        return DEFAULT_USER
+    key = re.sub(r"[^a-z0-9]+", "-", str(user).strip().lower()).strip("-")
+    return key or DEFAULT_USER
+
+def users_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(STORE_FILE)), USERS_DIR)
+
+def store_path(user=None):
+    """Alert store file of a user's shard. The default user keeps STORE_FILE."""
+    key = user_key(user)
+    if key == DEFAULT_USER:
+        return STORE_FILE
+    return os.path.join(users_dir(), key, "alerts.db")
+
+def list_users():
+    """Shard keys of every protected user with an alert store (default first)."""
+    users = [DEFAULT_USER]
+    if os.path.isdir(users_dir()):
+        users += sorted(name for name in os.listdir(users_dir())
+                        if name != DEFAULT_USER and os.path.exists(os.path.join(users_dir(), name, "alerts.db")))
+    return users
+
+
+# One store and one background writer per user shard. Shards never share a
+# file, so writers of different users don't contend; writers of the same
+# user serialize on the shard's file lock (see AlertStore._locked).
+_stores = {}
+_writers = {}
+_store_lock = threading.Lock()
+
+def get_store(user=None):
+    """Return the shared AlertStore of a user's shard, creating it on first use."""
+    key = user_key(user)
+    store = _stores.get(key)
+    if store is None:
+        with _store_lock:
+            store = _stores.get(key)
+            if store is None:
+                path = store_path(key)
+                if key != DEFAULT_USER:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Only the default user inherits the legacy single-user file
+                store = _stores[key] = AlertStore(path, DB_FILE if key == DEFAULT_USER else None)
+    return store
+
+def get_writer(user=None):
+    """Return the shared background AlertWriter of a user's shard."""
+    key = user_key(user)
+    writer = _writers.get(key)
+    if writer is None:
+        store = get_store(key)
+        with _store_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = AlertWriter(store)
+    return writer
+
+def flush(timeout=None, user=None):
+    """Block until every queued alert (of one user, or of all users) has been committed."""
+    if user is not None:
+        writers = [_writers[user_key(user)]] if user_key(user) in _writers else []
+    else:
+        writers = list(_writers.values())
+    return all([writer.flush(timeout=timeout) for writer in writers])
+
+def init_db(user=None):
+    """Initialize a user's alert store (and migrate the legacy JSON file) if needed."""
+    get_store(user).init()
+
+def make_alert(alert_type, risk_level, details, status="Blocked", message=None, sender=None):
+    """Build an alert record in the shape returned by get_alerts() (plus Message and Sender)."""
+    now = datetime.now()
+    return {
+        "Time": now.strftime("%I:%M %p"),
         "Type": alert_type,
         "Risk": risk_level,
         "Status": status,
         "Details": details,
-        "Timestamp": datetime.now().isoformat()
+        "Timestamp": now.isoformat(),
+        "Message": message,
+        "Sender": sender
     }
-    
-    try:
-        with open(DB_FILE, "r") as f:
-            data = json.load(f)
-        
-        # Prepend new alert (newest first)
-        data.insert(0, new_alert)
-        
-        with open(DB_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-            
-        return True
+
+def log_alert(alert_type, risk_level, details, status="Blocked", message=None, user=None, sender=None):
+    """
+    Log a new alert to the database.
+    message: the analyzed text, kept for retraining on confirmed scams.
+    user: the protected user the alert belongs to (None: the default user).
+    sender: phone number, address or SMS header the message came from.
+    The alert is queued for the background writer; call flush() to wait for it.
+    Returns False if the alert could not be queued or the store is failing to commit.
+    """
+    new_alert = make_alert(alert_type, risk_level, details, status, message, sender)
+
+    try:
+        return get_writer(user).submit([new_alert])
     except Exception as e:
         print(f"Error logging alert: {e}")
         return False
 
-def get_alerts():
-    """Fetch all alerts from the database."""
-    init_db()
+def log_alerts(alerts, user=None):
+    """
+    Log many alerts of one user at once.
+    alerts: iterable of (alert_type, risk_level, details, status[, message[, sender]]) tuples.
+    """
+    new_alerts = [make_alert(*alert) for alert in alerts]
+    if not new_alerts:
+        return True
+
     try:
-        with open(DB_FILE, "r") as f:
-            return json.load(f)
+        return get_writer(user).submit(new_alerts)
+    except Exception as e:
+        print(f"Error logging alerts: {e}")
+        return False
+
+def get_alerts(user=None):
+    """Fetch all alerts of a user from the database."""
+    try:
+        return get_store(user).fetch_all()
     except:
         return []
+
+def confirm_alert(alert_id, user=None):
+    """Mark an alert as a confirmed scam so online training picks it up."""
+    try:
+        return get_store(user).set_status(alert_id, CONFIRMED_STATUS)
+    except Exception as e:
+        print(f"Error confirming alert: {e}")
+        return False
+
+def get_alert_message(alert_id, user=None):
+    """(message, sender) stored with an alert, or None."""
+    try:
+        return get_store(user).message_of(alert_id)
+    except Exception as e:
+        print(f"Error reading alert: {e}")
+        return None
+
+def get_confirmed_messages(after_id=0, user=None):
+    """(id, message) pairs of a user's confirmed scam alerts newer than after_id."""
+    try:
+        return get_store(user).confirmed_messages(after_id)
+    except Exception as e:
+        print(f"Error reading confirmed alerts: {e}")
+        return []
+
+def get_scam_reports(after_id=0, user=None, confirmed_only=False):
+    """(id, message, sender) of a user's High-risk (unless confirmed_only) or confirmed alerts newer than after_id."""
+    try:
+        return get_store(user).scam_reports(after_id, confirmed_only)
+    except Exception as e:
+        print(f"Error reading scam reports: {e}")
+        return []
+
+def store_version(user=None):
+    """Counter that changes on every committed write to a user's shard (use it to key caches)."""
+    try:
+        return get_store(user).version()
+    except Exception as e:
+        print(f"Error reading store version: {e}")
+        return None
+
+def get_dashboard_stats(days=7, user=None):
+    """
+    Dashboard counters read from the materialized aggregates (no scan of
+    the alert log): total, today, counts by Type/Risk/Status, the last
+    `days` daily buckets and the last-seen time per type.
+    """
+    empty = {"total": 0, "today": 0, "last_alert": None, "by_type": {}, "by_risk": {},
+             "by_status": {}, "per_day": {}, "last_seen": {}}
+    try:
+        stats = get_store(user).stats()
+    except Exception as e:
+        print(f"Error reading dashboard stats: {e}")
+        return empty
+
+    today = datetime.now().date()
+    day_keys = [(today - timedelta(days=i)).isoformat() for i in range(days - 1, -1, -1)]
+    per_day = stats.get("Day", {})
+    total, last_alert = stats.get("All", {}).get("", (0, None))
+    return {
+        "total": total,
+        "today": per_day.get(today.isoformat(), (0, None))[0],
+        "last_alert": last_alert,
+        "by_type": {k: c for k, (c, _) in stats.get("Type", {}).items()},
+        "by_risk": {k: c for k, (c, _) in stats.get("Risk", {}).items()},
+        "by_status": {k: c for k, (c, _) in stats.get("Status", {}).items() if c},
+        "per_day": {day: per_day.get(day, (0, None))[0] for day in day_keys},
+        "last_seen": {k: ts for k, (_, ts) in stats.get("Type", {}).items()},
+    }
+
+def rebuild_aggregates(user=None):
+    """Recompute a user's dashboard aggregates from the raw alert log."""
+    flush(user=user)
+    get_store(user).rebuild_stats()
+
+def compact(user=None):
+    """
+    Seal old days into compressed segments and apply downsampling/retention,
+    for one user or (user=None) for every user. Returns the summed summary.
+    """
+    flush(user=user)
+    total = {"sealed": 0, "downsampled": 0, "expired": 0}
+    for key in ([user] if user is not None else list_users()):
+        for name, count in get_store(key).compact().items():
+            total[name] += count
+    return total
+
+_compactor = None
+
+def _compact_forever(interval, stop):
+    while not stop.is_set():
+        try:
+            summary = compact()
+            if any(summary.values()):
+                print(f"Alert store compaction: {summary}")
+        except Exception as e:
+            print(f"Error compacting alert store: {e}")
+        stop.wait(interval)
+
+def start_compactor(interval=COMPACT_INTERVAL):
+    """
+    Run compact() every `interval` seconds on a background thread (once per
+    process). Returns an Event that stops it when set.
+    """
+    global _compactor
+    with _store_lock:
+        if _compactor is None:
+            stop = threading.Event()
+            threading.Thread(target=_compact_forever, args=(interval, stop),
+                             name="alert-compactor", daemon=True).start()
+            _compactor = stop
+    return _compactor
+
+def query_alerts(since=None, until=None, alert_type=None, risk=None, status=None,
+                 limit=DEFAULT_PAGE_SIZE, cursor=None, user=None):
+    """
+    Fetch one page of alerts, newest first.
+    Filters: since/until (datetime or ISO string), alert_type, risk, status.
+    Returns (alerts, next_cursor); pass next_cursor back to get the following
+    page. next_cursor is None on the last page.
+    """
+    try:
+        return get_store(user).query(since, until, alert_type, risk, status, limit, cursor)
+    except Exception as e:
+        print(f"Error querying alerts: {e}")
+        return [], None
+
+def _user_cursor(cursor, user):
+    """Per-shard keyset cursor equivalent to a global (ts, user, id) cursor."""
+    timestamp, cursor_user, alert_id = cursor
+    if user == cursor_user:
+        return _encode_cursor(timestamp, alert_id)
+    # Newest first, ties broken by user then id (both descending): at the
+    # cursor's timestamp, users sorting before it still have every row left,
+    # users sorting after it have none.
+    return _encode_cursor(timestamp, 2 ** 62 if user < cursor_user else 0)
+
+def query_all_users(since=None, until=None, alert_type=None, risk=None, status=None,
+                    limit=DEFAULT_PAGE_SIZE, cursor=None, users=None):
+    """
+    Scatter-gather page across users (e.g. a caregiver watching several
+    people): each shard returns its newest `limit` matches in parallel and
+    the pages are merged newest first. Alerts carry a "User" field.
+    Returns (alerts, next_cursor) like query_alerts().
+    """
+    users = [user_key(u) for u in (users or list_users())]
+    decoded = None
+    if cursor:
+        timestamp, cursor_user, alert_id = cursor.rsplit("|", 2)
+        decoded = (timestamp, cursor_user, int(alert_id))
+
+    def fetch(user):
+        shard_cursor = _user_cursor(decoded, user) if decoded else None
+        rows = get_store(user).query_rows(since, until, alert_type, risk, status, limit + 1, shard_cursor)
+        return [(row[6], user, row[0], row) for row in rows]
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(len(users), 16) or 1, thread_name_prefix="alert-query") as pool:
+            pages = list(pool.map(fetch, users))
+    except Exception as e:
+        print(f"Error querying alerts: {e}")
+        return [], None
+
+    merged = list(heapq.merge(*pages, key=lambda item: item[:3], reverse=True))[:limit + 1]
+    next_cursor = None
+    if len(merged) > limit:
+        merged = merged[:limit]
+        timestamp, user, alert_id, _ = merged[-1]
+        next_cursor = f"{timestamp}|{user}|{alert_id}"
+    return [dict(zip(ALERT_FIELDS, row[1:]), Id=row[0], User=user) for _, user, _, row in merged], next_cursor
@@ -0,0 +1,247 @@
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Analysis frames
+FRAME_MS = 25
+HOP_MS = 10
+N_MELS = 26
+N_MFCC = 13
+PITCH_RANGE_HZ = (70, 400)
+
+# A frame counts as voiced when its normalized autocorrelation peak in the
+# pitch range exceeds this, and as silent below SILENCE_RMS (full scale = 1).
+VOICING_THRESHOLD = 0.45
+SILENCE_RMS = 0.003
+
+# Below this much voiced speech there is no verdict
+MIN_VOICED_SECONDS = 0.5
+
+# Speech gate: speech mixes voiced and unvoiced sounds and moves its pitch
+# around; hum, tones and buzzes are voiced throughout at a steady pitch.
+# Input failing either test gets no confidence.
+MAX_VOICED_SHARE = 0.9
+MIN_PITCH_STD_SEMITONES = 1.0
+
+# The CUES below are uncalibrated, so the confidence is reported for
+# information only and never flags a call. Set CALIBRATED once they are
+# fitted on labeled calls; from then on ALERT_CONFIDENCE (0-100) flags a
+# call on the voice alone.
+CALIBRATED = False
+ALERT_CONFIDENCE = 80
+
+# Synthetic-voice cues: (reference value, scale, weight). Each cue scores
+# ~1 well below its reference and ~0 well above it. Cloned and vocoded
+# voices hold pitch too steadily (low jitter), keep the spectrum unnaturally
+# uniform (low flatness spread) and smooth the formant transitions (small
+# MFCC deltas). These are hand-set starting points; recalibrate them on
+# labeled real and cloned calls, then set CALIBRATED.
+CUES = {
+    "jitter": (0.012, 0.004, 0.45),
+    "flatness_std": (0.035, 0.012, 0.25),
+    "mfcc_delta": (0.45, 0.12, 0.30),
+}
+
+
+def _mel_filterbank(sample_rate, n_fft, n_mels):
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    top = min(8000, sample_rate / 2)
+    edges = mel_to_hz(np.linspace(hz_to_mel(60), hz_to_mel(top), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+def _dct_matrix(n_in, n_out):
+    """DCT-II basis, shape (n_in, n_out)."""
+    n = np.arange(n_in)[:, None]
+    k = np.arange(n_out)[None, :]
+    return np.cos(np.pi / n_in * (n + 0.5) * k).astype(np.float32)
+
+def samples(audio_data):
+    """
+    Mono int16 samples of an AudioData. For 16-bit audio this is a view
+    over the raw buffer, not a copy.
+    """
+    if audio_data.sample_width == 2:
+        raw = audio_data.frame_data
+        return np.frombuffer(raw, dtype="<i2", count=len(raw) // 2)
+    return np.frombuffer(audio_data.get_raw_data(convert_width=2), dtype="<i2")
+
+def _cue_score(value, reference, scale):
+    return float(1 / (1 + np.exp((value - reference) / scale)))
+
+
+class VoiceAnalyzer:
+    """
+    Incremental synthetic-voice screening over a stream of AudioData chunks.
+
+    feed() frames each chunk (frames that straddle chunks are stitched from
+    the previous chunk's tail), computes per-frame spectral flatness,
+    MFCC-style cepstra and autocorrelation pitch in a few vectorized NumPy
+    operations, and folds them into running sums. report() turns the sums
+    into an independent 0-100 confidence that the voice is synthetic.
+    """
+
+    def __init__(self, sample_rate=16000):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * FRAME_MS / 1000)
+        self.hop = int(sample_rate * HOP_MS / 1000)
+        # Zero-padded to twice the frame so the autocorrelation is not circular
+        self.n_fft = 1 << int(np.ceil(np.log2(2 * self.frame_len)))
+        self.window = np.hanning(self.frame_len).astype(np.float32)
+        self.mel = _mel_filterbank(sample_rate, self.n_fft, N_MELS)
+        self.dct = _dct_matrix(N_MELS, N_MFCC)
+        self.min_lag = int(sample_rate / PITCH_RANGE_HZ[1])
+        self.max_lag = int(sample_rate / PITCH_RANGE_HZ[0])
+
+        self._lock = threading.Lock()
+        self._tail = np.zeros(0, dtype=np.int16)
+        self._prev_period = np.nan
+        self._prev_mfcc = None
+        self.frames = 0
+        self.sounding = 0
+        self.voiced = 0
+        self._pitch_n = 0
+        self._pitch_sum = 0.0
+        self._pitch_sq = 0.0
+        self._flat_n = 0
+        self._flat_sum = 0.0
+        self._flat_sq = 0.0
+        self._jitter_num = 0.0
+        self._jitter_den = 0.0
+        self._delta_n = 0
+        self._delta_sum = 0.0
+
+    # Framing
+    def feed(self, audio_data):
+        """Add one chunk of the stream (AudioData at this analyzer's sample rate)."""
+        x = samples(audio_data)
+        with self._lock:
+            if self._tail.size and x.size < self.frame_len:
+                x = np.concatenate((self._tail, x))
+                self._tail = self._tail[:0]
+
+            start = 0
+            if self._tail.size:
+                # Frames starting in the previous chunk's tail
+                n_head = -(-self._tail.size // self.hop)
+                head = np.concatenate((self._tail, x[:self.frame_len]))
+                self._process(sliding_window_view(head, self.frame_len)[::self.hop][:n_head])
+                start = n_head * self.hop - self._tail.size
+
+            body = x[start:]
+            n = (body.size - self.frame_len) // self.hop + 1 if body.size >= self.frame_len else 0
+            if n:
+                self._process(sliding_window_view(body, self.frame_len)[::self.hop][:n])
+            self._tail = body[n * self.hop:].copy()
+
+    def _process(self, frames):
+        """frames: (n, frame_len) int16 view."""
+        if not len(frames):
+            return
+        x = frames.astype(np.float32) * (self.window / 32768.0)
+        rms = np.sqrt(np.mean(x * x, axis=1))
+        spectrum = np.fft.rfft(x, n=self.n_fft, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2 + 1e-12
+
+        # Spectral flatness: geometric / arithmetic mean of the power spectrum
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+        # MFCC-style cepstrum over mel band energies
+        mfcc = np.log(power @ self.mel.T + 1e-10) @ self.dct
+
+        # Pitch from the autocorrelation (inverse FFT of the power spectrum)
+        ac = np.fft.irfft(power, n=self.n_fft, axis=1)[:, :self.max_lag + 2]
+        ac /= ac[:, :1]
+        lags = np.argmax(ac[:, self.min_lag:self.max_lag + 1], axis=1) + self.min_lag
+        rows = np.arange(len(lags))
+        a, b, c = ac[rows, lags - 1], ac[rows, lags], ac[rows, lags + 1]
+        curvature = a - 2 * b + c
+        offset = np.where(curvature < 0, 0.5 * (a - c) / np.where(curvature < 0, curvature, -1), 0)
+        # A peak on the edge of the lag range isn't a local maximum; keep the vertex within half a lag
+        offset = np.clip(offset, -0.5, 0.5)
+        sounding = rms > SILENCE_RMS
+        voiced = sounding & (b > VOICING_THRESHOLD)
+        period = np.where(voiced, lags + offset, np.nan)
+
+        self.frames += len(frames)
+        self.sounding += int(sounding.sum())
+        self.voiced += int(voiced.sum())
+
+        # Pitch spread in semitones (12 * log2 of the period)
+        semitones = 12 * np.log2(period[voiced])
+        self._pitch_n += semitones.size
+        self._pitch_sum += float(semitones.sum())
+        self._pitch_sq += float((semitones * semitones).sum())
+
+        f = flatness[sounding]
+        self._flat_n += f.size
+        self._flat_sum += float(f.sum())
+        self._flat_sq += float((f * f).sum())
+
+        # Frame-to-frame pitch perturbation, skipping octave jumps
+        periods = np.concatenate(([self._prev_period], period))
+        prev, cur = periods[:-1], periods[1:]
+        pairs = ~np.isnan(prev) & ~np.isnan(cur)
+        pairs[pairs] &= np.abs(cur[pairs] - prev[pairs]) < 0.2 * prev[pairs]
+        self._jitter_num += float(np.abs(cur[pairs] - prev[pairs]).sum())
+        self._jitter_den += float(cur[pairs].sum())
+        self._prev_period = period[-1]
+
+        # Spectral dynamics between adjacent voiced frames
+        m = mfcc[:, 1:]
+        carried = self._prev_mfcc is not None
+        prev = np.vstack((self._prev_mfcc if carried else m[:1], m[:-1]))
+        adjacent = np.concatenate(([carried], voiced[:-1])) & voiced
+        deltas = np.abs(m[adjacent] - prev[adjacent]).mean(axis=1)
+        self._delta_n += deltas.size
+        self._delta_sum += float(deltas.sum())
+        self._prev_mfcc = m[-1:] if voiced[-1] else None
+
+    # Verdict
+    def report(self):
+        """
+        Running features and synthetic-voice confidence (None until enough
+        speech, and for input that doesn't pass the speech gate).
+        """
+        with self._lock:
+            voiced_seconds = self.voiced * self.hop / self.sample_rate
+            voiced_share = self.voiced / self.sounding if self.sounding else 0.0
+            pitch_std = (float(np.sqrt(max(self._pitch_sq / self._pitch_n - (self._pitch_sum / self._pitch_n) ** 2, 0)))
+                         if self._pitch_n else 0.0)
+            features = {
+                "jitter": self._jitter_num / self._jitter_den if self._jitter_den else None,
+                "flatness_std": (float(np.sqrt(max(self._flat_sq / self._flat_n - (self._flat_sum / self._flat_n) ** 2, 0)))
+                                 if self._flat_n else None),
+                "mfcc_delta": self._delta_sum / self._delta_n if self._delta_n else None,
+            }
+        speech = voiced_share <= MAX_VOICED_SHARE and pitch_std >= MIN_PITCH_STD_SEMITONES
+        confidence = None
+        if speech and voiced_seconds >= MIN_VOICED_SECONDS and all(v is not None for v in features.values()):
+            total = sum(weight * _cue_score(features[name], ref, scale)
+                        for name, (ref, scale, weight) in CUES.items())
+            confidence = int(round(100 * total / sum(w for _, _, w in CUES.values())))
+        return {
+            "confidence": confidence,
+            "voiced_seconds": round(voiced_seconds, 2),
+            "speech": speech,
+            "voiced_share": round(voiced_share, 3),
+            "pitch_std_semitones": round(pitch_std, 2),
+            **{name: (round(value, 5) if value is not None else None) for name, value in features.items()},
+        }
+
+
+def analyze(audio_data):
+    """Synthetic-voice report for a single clip."""
+    analyzer = VoiceAnalyzer(audio_data.sample_rate)
+    analyzer.feed(audio_data)
+    return analyzer.report()
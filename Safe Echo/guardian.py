@@ -1,224 +1,505 @@
+import logging
+import threading
+import time
 import db
-import joblib
-import os
+import reputation
+import shared_model
+import telemetry
+from model_registry import get_registry
+from rules import MATCHER
+from verdict_cache import VerdictCache, normalize_text
 
-# Load Model (Lazy Loading)
-model = None
-try:
-    if os.path.exists("text_model.pkl"):
-        model = joblib.load("text_model.pkl")
-except Exception as e:
-    print(f"Error loading model: {e}")
+log = logging.getLogger(__name__)
 
-def get_simple_explanation(text):
+# Model Registry (real lazy loading: nothing is read until the first request).
+# Worker processes started with SAFEECHO_SHARED_MODEL=1 map the shared model instead.
+registry = shared_model.get_reader() if shared_model.ENABLED else get_registry()
+
+# After a failed model load, requests fall back to the keyword rules and the
+# load is retried after MODEL_RETRY_SECONDS, doubling up to MODEL_RETRY_MAX.
+MODEL_RETRY_SECONDS = 5.0
+MODEL_RETRY_MAX = 300.0
+_model_error = None
+_model_retry_at = 0.0
+_model_retry_delay = 0.0
+_model_lock = threading.Lock()
+
+# Verdicts for repeated messages, keyed on normalized text + saved-contact
+# flag + known-bad entity
+verdict_cache = VerdictCache(maxsize=10000, ttl=3600)
+
+# A known-bad sender, number or website is evidence, not a verdict: it is
+# folded into the model's scam probability as p' = 1 - (1 - p)(1 - prior).
+# That flags an unknown sender's message (threshold 0.4) but not, on its
+# own, a saved contact's (0.85).
+REPUTATION_PRIOR = 0.6
+
+def get_simple_explanation(text, found=None):
     """
     Returns a simple, educational explanation for why a text is suspicious.
     Target Audience: Ages 8-80.
+    found: phrases already matched by rules.MATCHER.scan(text), to skip rescanning.
+    """
+    if found is None:
+        found = MATCHER.scan(text)
+    return MATCHER.explanation(found)
+
+def _model_verdict(text, probability, is_saved, found):
+    """
+    Applies the threshold and explanation rules to a model score.
+    Returns (result, alert) where alert is a db.log_alert argument tuple or None,
+    or None when the score is below threshold and keywords should decide.
     """
-    text_lower = text.lower()
+    confidence = int(probability * 100)
     
-    # Rule-based explanations
-    if any(x in text_lower for x in ["western union", "gift card", "wire transfer"]):
-        return "⚠️ **Money Danger**: A stranger is asking you to send money. Real companies never ask for gift cards or wire transfers."
+    # Threshold logic
+    # Default strict threshold for unknown numbers
+    threshold = 0.4 
     
-    if any(x in text_lower for x in ["password", "verify", "login", "account is locked"]):
-        return "🛑 **Account Risk**: Someone is trying to steal your password. Never click links that ask you to log in."
-        
-    if any(x in text_lower for x in ["urgent", "immediately", "warrant", "jail", "suspended"]):
-        return "⏳ **Panic Trick**: Scammers use scary words like 'Urgent' or 'Jail' to make you act without thinking. Take a deep breath."
+    if is_saved:
+        # Relaxed threshold for saved contacts to avoid false positives
+        # Only flag if very high confidence
+        threshold = 0.85
+    
+    if probability > threshold:
+        # GENERATE SIMPLE EXPLANATION
+        reason = get_simple_explanation(text, found)
         
-    if any(x in text_lower for x in ["soulmate", "destiny", "love you", "my love"]):
-        return "💔 **Romance Scam**: Be careful when someone you met online asks for money. Real love doesn't cost $500."
+        # If no specific rule matched, be careful about flagging generic text
+        if reason is None:
+            # Only flag if it's not a short greeting (heuristic)
+            if len(text.split()) > 3:
+                reason = "🤖 **AI Warning**: This message has patterns seen in scams. Proceed with caution."
+                return {"is_scam": True, "reason": reason, "confidence": confidence}, ("SMS/Text", "Low", reason, "Flagged")
+            else:
+                # It's likely a false positive on a short string like "Hello"
+                return {"is_scam": False, "reason": "✅ **Safe**: Looks like a normal greeting.", "confidence": 90}, None
         
-    if any(x in text_lower for x in ["investment", "returns", "profit", "fund"]):
-        return "💰 **Too Good To Be True**: If they promise you'll get rich quick, it's a lie. Keep your money safe."
+        return {"is_scam": True, "reason": reason, "confidence": confidence}, ("SMS/Text", "High", reason, "Quarantined")
+    
+    return None
+
+def _keyword_verdict(text, is_saved, found):
+    """Fallback keyword detection. Returns (result, alert)."""
+    # If saved contact, only check for very specific high-danger keywords if ML failed or didn't run
+    word = MATCHER.first_keyword(found, saved_contact=is_saved)
+    if word is not None:
+        # GENERATE SIMPLE EXPLANATION
+        reason = get_simple_explanation(text, found)
+        if reason is None:
+            reason = f"⚠️ **Keyword Alert**: Contains suspicious word '{word}'."
         
-    if any(x in text_lower for x in ["security patch", "microsoft", "admin access", "virus"]):
-        return "💻 **Fake Support**: Microsoft will never call or email you to fix your computer. Do not let them control your screen."
+        return {
+            "is_scam": True,
+            "reason": reason,
+            "confidence": 85
+        }, ("SMS/Text", "Medium", reason, "Quarantined")
+            
+    return {"is_scam": False, "reason": "✅ **Safe**: This message looks like a normal conversation.", "confidence": 95}, None
 
-    return None
+def current_model():
+    """
+    The registry's model for this request, or None (keyword rules only)
+    while it can't be loaded. A failure is logged once and retried with
+    backoff; every request served degraded counts in safeecho_degraded_total.
+    """
+    global _model_error, _model_retry_at, _model_retry_delay
+    if _model_error is not None and time.monotonic() < _model_retry_at:
+        telemetry.inc("safeecho_degraded_total", stage="model")
+        return None
+    try:
+        m = registry.current()
+    except Exception as e:
+        with _model_lock:
+            if _model_error is None:
+                log.error("Model unavailable, using keyword rules only: %s", e)
+            _model_error = str(e)
+            _model_retry_delay = min(max(2 * _model_retry_delay, MODEL_RETRY_SECONDS), MODEL_RETRY_MAX)
+            _model_retry_at = time.monotonic() + _model_retry_delay
+        telemetry.inc("safeecho_errors_total", stage="model_load")
+        telemetry.inc("safeecho_degraded_total", stage="model")
+        return None
+    if _model_error is not None:
+        with _model_lock:
+            if _model_error is not None:
+                log.warning("Model available again (version %s)", m.version if m else None)
+                _model_error, _model_retry_delay = None, 0.0
+    return m
+
+def _classify(text, is_saved, probability=None, entity=None):
+    """
+    Model verdict if the score decides it, otherwise the keyword fallback.
+    entity: key of a known-bad entity in the message, which raises the score.
+    """
+    # One pass over the text finds every rule and keyword phrase
+    found = MATCHER.scan(text)
+    boosted = _with_reputation(probability, entity)
+    if boosted is not None:
+        verdict = _model_verdict(text, boosted, is_saved, found)
+        if verdict is not None:
+            return _note_reputation(verdict, entity)
+    return _note_reputation(_keyword_verdict(text, is_saved, found), entity)
+
+def _with_reputation(probability, entity):
+    """Scam probability raised by a known-bad entity (the prior alone without a model score)."""
+    if entity is None:
+        return probability
+    if probability is None:
+        return REPUTATION_PRIOR
+    return 1 - (1 - probability) * (1 - REPUTATION_PRIOR)
+
+def _note_reputation(verdict, entity):
+    """Name the known-bad entity in a scam verdict's reason."""
+    result, alert = verdict
+    if entity is None or not result["is_scam"]:
+        return verdict
+    reason = f"{result['reason']} 🚫 {reputation.describe(entity)} has been reported in scam messages before."
+    return dict(result, reason=reason), (alert[:2] + (reason,) + alert[3:] if alert else None)
+
+def _prescreen(text, sender):
+    """
+    Reputation lookup before scoring: ('known' or 'bad', entity key) for a
+    known scammer or a known-bad entity in the message, else (None, None).
+    Until the index is built, every message counts as unknown.
+    """
+    index = reputation.ready_index()
+    if index is None:
+        telemetry.inc("safeecho_reputation_total", result="building")
+        return None, None
+    standing, entity = index.screen(text, sender)
+    telemetry.inc("safeecho_reputation_total", result=standing or "unknown")
+    return standing, entity
+
+def _known_scam_verdict(entity):
+    """Verdict for a message from a known scammer (no model or rules needed)."""
+    reason = (f"🚫 **Known Scammer**: {reputation.describe(entity)} has been reported in "
+              f"{reputation.get_index().reports(entity)} scam messages. Do not reply, click or call back.")
+    return {"is_scam": True, "reason": reason, "confidence": 99}, ("SMS/Text", "High", reason, "Blocked")
+
+def _cache_key(normalized, is_saved, entity=None):
+    return normalized, bool(is_saved), entity
+
+def _copy_result(result):
+    # Callers (e.g. analyze_audio) add keys to the result dict
+    return dict(result)
+
+def cache_stats():
+    """Hit/miss counters of the verdict cache."""
+    return verdict_cache.stats()
+
+def _finish(result, timings, started):
+    """Copy of a cached/computed result, with the timing breakdown if requested."""
+    result = _copy_result(result)
+    if timings is not None:
+        timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+        result["timings"] = timings
+    return result
 
 def analyze_text(text, context=None):
     """
     Analyzes text using the trained ML model.
-    Context: dict with keys like 'is_saved_contact' (bool)
+    Context: dict with keys like 'is_saved_contact' (bool), 'sender' (phone
+    number, address or SMS header), 'user' (the protected user whose alert
+    log gets the alert) and 'timings' (bool, attach a per-stage latency
+    breakdown to the result).
     """
-    global model
+    started = time.perf_counter()
     
     # Default context
     if context is None:
         context = {}
     
     is_saved = context.get('is_saved_contact', False)
+    sender = context.get('sender')
+    timings = telemetry.timings_for(context)
+    
+    # 0. Reputation pre-screen. A known scammer is blocked right away; a
+    # known-bad sender, number or website raises the model's score.
+    with telemetry.span("reputation", timings):
+        standing, entity = _prescreen(text, sender)
+    if standing == "known":
+        result, alert = _known_scam_verdict(entity)
+        with telemetry.span("log_alert", timings):
+            db.log_alert(*alert, message=text, user=context.get('user'), sender=sender)
+        telemetry.inc("safeecho_verdicts_total", kind="text", scam=True)
+        return _finish(result, timings, started)
     
-    # 1. ML Prediction (if model exists)
-    if model:
+    # Model snapshot for this request (a hot swap won't affect it)
+    with telemetry.span("model", timings):
+        m = current_model()
+    
+    # 1. Verdict Cache (bulk campaigns repeat the same text). The model and
+    # rules below score the normalized text too, so the key decides the verdict.
+    normalized = normalize_text(text)
+    with telemetry.span("cache_lookup", timings):
+        verdict_cache.bind(m.token if m else None)
+        key = _cache_key(normalized, is_saved, entity)
+        cached = verdict_cache.get(key)
+    if cached is not None:
+        telemetry.inc("safeecho_verdict_cache_total", result="hit")
+        result, alert = cached
+        if alert:
+            with telemetry.span("log_alert", timings):
+                db.log_alert(*alert, message=text, user=context.get('user'), sender=sender)
+        telemetry.inc("safeecho_verdicts_total", kind="text", scam=result["is_scam"])
+        return _finish(result, timings, started)
+    telemetry.inc("safeecho_verdict_cache_total", result="miss")
+    
+    # 2. ML Prediction (if model exists)
+    probability = None
+    scored = True
+    if m:
         try:
-            # Get probability of scam (class 1)
-            # Assuming model.classes_ is ['safe', 'scam'] or similar. 
-            # We find the index of 'scam' dynamically to be safe.
-            scam_idx = list(model.classes_).index('scam')
-            probability = model.predict_proba([text])[0][scam_idx]
-            confidence = int(probability * 100)
-            
-            # Threshold logic
-            # Default strict threshold for unknown numbers
-            threshold = 0.4 
-            
-            if is_saved:
-                # Relaxed threshold for saved contacts to avoid false positives
-                # Only flag if very high confidence
-                threshold = 0.85
-            
-            if probability > threshold:
-                # GENERATE SIMPLE EXPLANATION
-                reason = get_simple_explanation(text)
-                
-                # If no specific rule matched, be careful about flagging generic text
-                if reason is None:
-                    # Only flag if it's not a short greeting (heuristic)
-                    if len(text.split()) > 3:
-                        reason = "🤖 **AI Warning**: This message has patterns seen in scams. Proceed with caution."
-                        db.log_alert("SMS/Text", "Low", reason, "Flagged")
-                        return {"is_scam": True, "reason": reason, "confidence": confidence}
-                    else:
-                        # It's likely a false positive on a short string like "Hello"
-                        return {"is_scam": False, "reason": "✅ **Safe**: Looks like a normal greeting.", "confidence": 90}
-                
-                db.log_alert("SMS/Text", "High", reason, "Quarantined")
-                return {"is_scam": True, "reason": reason, "confidence": confidence}
+            # Get probability of scam
+            with telemetry.span("predict_proba", timings):
+                probability = m.predict_proba([normalized])[0]
         except Exception as e:
-            print(f"Model prediction error: {e}")
-
-    # 2. Fallback: Keyword Detection
-    scam_keywords = [
-        "urgent", "bank", "verify", "password", "ssn", "gift card", "compromised", "jail", "warrant", 
-        "western union", "visa fee", "soulmate", "destiny", "flight delayed", "investment", "returns", 
-        "ticker", "security patch", "admin access", "support line", "microsoft", "diagnostic tool",
-        "otp", "cvv", "lottery", "prize", "click here", "winner", "cash", "refund", "blocked", 
-        "suspended", "kyc", "pan card", "aadhar", "sim card", "electricity", "ransom", "arrest",
-        "transfer", "upi", "gpay", "paytm", "lost phone", "new number"
-    ]
+            scored = False
+            telemetry.inc("safeecho_errors_total", stage="predict_proba")
+            log.warning("Model prediction error: %s", e)
+
+    # 3. Verdict (falls back to Keyword Detection below threshold or without a model)
+    with telemetry.span("rules", timings):
+        result, alert = _classify(normalized, is_saved, probability, entity)
+    if scored:
+        verdict_cache.put(key, (result, alert))
+    if alert:
+        with telemetry.span("log_alert", timings):
+            db.log_alert(*alert, message=text, user=context.get('user'), sender=sender)
+    telemetry.inc("safeecho_verdicts_total", kind="text", scam=result["is_scam"])
+    return _finish(result, timings, started)
+
+def analyze_texts(texts, contexts=None):
+    """
+    Batch version of analyze_text.
+    Scores every uncached message in one predict_proba call and returns one
+    result per message, in order. contexts is a list parallel to texts, or one
+    dict that applies to all of them. Alerts are written in one bulk call per
+    protected user.
+    """
+    texts = list(texts)
+    if contexts is None or isinstance(contexts, dict):
+        contexts = [contexts or {}] * len(texts)
+    if len(contexts) != len(texts):
+        raise ValueError("contexts must have one entry per text")
     
-    # If saved contact, only check for very specific high-danger keywords if ML failed or didn't run
-    if is_saved:
-        # Reduced list for saved contacts
-        scam_keywords = ["password", "ssn", "cvv", "otp"]
-
-    text_lower = text.lower()
-    for word in scam_keywords:
-        if word in text_lower:
-            # GENERATE SIMPLE EXPLANATION
-            reason = get_simple_explanation(text)
-            if reason is None:
-                reason = f"⚠️ **Keyword Alert**: Contains suspicious word '{word}'."
-            
-            db.log_alert("SMS/Text", "Medium", reason, "Quarantined")
-            return {
-                "is_scam": True,
-                "reason": reason,
-                "confidence": 85
-            }
-            
-    return {"is_scam": False, "reason": "✅ **Safe**: This message looks like a normal conversation.", "confidence": 95}
+    m = current_model()
+    verdict_cache.bind(m.token if m else None)
+    
+    # 0. Reputation pre-screen (known scammers are decided here), then the Verdict Cache
+    verdicts = [None] * len(texts)
+    keys = [None] * len(texts)
+    pending = []
+    with telemetry.span("batch_reputation"):
+        screened = [_prescreen(text, (context or {}).get('sender')) for text, context in zip(texts, contexts)]
+    known = 0
+    with telemetry.span("batch_cache_lookup"):
+        for i, (text, context) in enumerate(zip(texts, contexts)):
+            standing, entity = screened[i]
+            if standing == "known":
+                verdicts[i] = _known_scam_verdict(entity)
+                known += 1
+                continue
+            is_saved = (context or {}).get('is_saved_contact', False)
+            key = keys[i] = _cache_key(normalize_text(text), is_saved, entity)
+            verdicts[i] = verdict_cache.get(key)
+            if verdicts[i] is None:
+                pending.append(i)
+    telemetry.inc("safeecho_verdict_cache_total", len(texts) - known - len(pending), result="hit")
+    telemetry.inc("safeecho_verdict_cache_total", len(pending), result="miss")
+    
+    # 1. ML Prediction for every miss in one call (if model exists)
+    probabilities = [None] * len(pending)
+    scored = True
+    if m and pending:
+        try:
+            with telemetry.span("batch_predict_proba"):
+                probabilities = m.predict_proba([keys[i][0] for i in pending]).tolist()
+        except Exception as e:
+            scored = False
+            telemetry.inc("safeecho_errors_total", stage="predict_proba")
+            log.warning("Model prediction error: %s", e)
+    
+    # 2. Per-message verdicts
+    with telemetry.span("batch_rules"):
+        for i, probability in zip(pending, probabilities):
+            normalized, is_saved, entity = keys[i]
+            result, alert = _classify(normalized, is_saved, probability, entity)
+            verdicts[i] = (result, alert)
+            if scored:
+                verdict_cache.put(keys[i], verdicts[i])
+    
+    alerts = {}
+    for text, context, (result, alert) in zip(texts, contexts, verdicts):
+        if alert:
+            alerts.setdefault((context or {}).get('user'), []).append(alert + (text, (context or {}).get('sender')))
+    if alerts:
+        with telemetry.span("batch_log_alerts"):
+            for user, user_alerts in alerts.items():
+                db.log_alerts(user_alerts, user=user)
+    n_alerts = sum(len(user_alerts) for user_alerts in alerts.values())
+    telemetry.inc("safeecho_verdicts_total", n_alerts, kind="text", scam=True)
+    telemetry.inc("safeecho_verdicts_total", len(texts) - n_alerts, kind="text", scam=False)
+    return [_copy_result(result) for result, _ in verdicts]
 
 import speech_recognition as sr
-from deep_translator import GoogleTranslator
-
-# Initialize Translator (Not needed as object for deep_translator usually, but we can wrap it or just use it directly)
+import deepfake
+import speech
+import translation
 
-def process_audio_input(audio_file, language_code):
+def load_audio(audio_file, timings=None, session=None):
     """
-    Transcribes audio and translates to English.
-    Handles low-quality audio and background noise.
+    Loads a path / file-like object / AudioData through the caller's
+    RecognizerSession (default session if None), which keeps the calibrated
+    noise profile between clips. Returns (AudioData, None) or (None, error message).
     """
-    r = sr.Recognizer()
+    session = session or speech.get_session()
     
-    # Settings for low-quality audio
-    r.energy_threshold = 300  # Lower threshold for quiet voices
-    r.dynamic_energy_threshold = True
-    r.pause_threshold = 0.8
+    try:
+        return session.load(audio_file, timings), None
+    except ValueError as e:
+        telemetry.inc("safeecho_errors_total", stage="load_audio", error="format")
+        return None, f"Audio Format Error: {e}"
+    except Exception as e:
+        telemetry.inc("safeecho_errors_total", stage="audio", error=type(e).__name__)
+        return None, f"Error: {e}"
+
+def transcribe_audio(audio_data, language_code, timings=None, session=None):
+    """
+    Speech-to-text stage. Returns (transcript, None), or (None, error message)
+    when the audio can't be transcribed.
+    """
+    session = session or speech.get_session()
     
     try:
-        # Load audio file or use existing AudioData
-        if isinstance(audio_file, sr.AudioData):
-            audio_data = audio_file
-        else:
-            with sr.AudioFile(audio_file) as source:
-                # Calibrate for background noise (crucial for bad mics)
-                print("Calibrating for noise...")
-                r.adjust_for_ambient_noise(source, duration=0.5)
-                audio_data = r.record(source)
-            
-        # Transcribe
-        # Map UI languages to Google Speech API codes
-        lang_map = {
-            "English": "en-US",
-            "Hindi": "hi-IN",
-            "Marathi": "mr-IN"
-        }
-        api_lang = lang_map.get(language_code, "en-US")
-        
-        print(f"Transcribing in {api_lang}...")
-        # show_all=False returns just the text
-        text = r.recognize_google(audio_data, language=api_lang)
-        print(f"Original Text: {text}")
-        
-        # Translate if not English
-        if language_code != "English":
-            print("Translating to English...")
-            english_text = GoogleTranslator(source='auto', target='en').translate(text)
-            print(f"Translated: {english_text}")
-            return text, english_text
-        
-        return text, text
+        return session.transcribe(audio_data, language_code, timings), None
         
     except sr.UnknownValueError:
+        telemetry.inc("safeecho_errors_total", stage="speech_to_text", error="unknown_value")
         return None, "Could not understand audio. Please speak clearly."
     except sr.RequestError as e:
+        telemetry.inc("safeecho_errors_total", stage="speech_to_text", error="request")
         return None, f"Speech API Error (Check Internet): {e}"
-    except ValueError as e:
-        return None, f"Audio Format Error: {e}"
     except Exception as e:
+        telemetry.inc("safeecho_errors_total", stage="audio", error=type(e).__name__)
         return None, f"Error: {e}"
 
-def analyze_audio(audio_file, language="English", context=None):
+def load_and_transcribe(audio_file, language_code, timings=None, session=None):
+    """load_audio + transcribe_audio. Returns (AudioData, transcript, error)."""
+    audio_data, error = load_audio(audio_file, timings, session)
+    if audio_data is None:
+        return None, None, error
+    text, error = transcribe_audio(audio_data, language_code, timings, session)
+    return audio_data, text, error
+
+def translate_transcript(text, language_code, timings=None):
     """
-    Analyzes audio for deepfakes AND content scams.
+    Translation stage: English text for a transcript.
+    If the translator is slow or down, the original text is returned so the
+    verdict is never stalled on it.
+    """
+    if language_code == "English":
+        return text
+    with telemetry.span("translate", timings):
+        english_text = translation.get_translator().translate(text)
+    return text if english_text is None else english_text
+
+def process_audio_input(audio_file, language_code, timings=None, session=None):
+    """
+    Transcribes audio and translates to English.
+    Handles low-quality audio and background noise.
+    timings: optional dict that receives the per-stage latency breakdown.
+    """
+    _, text, error = load_and_transcribe(audio_file, language_code, timings, session)
+    if text is None:
+        return None, error
+    return text, translate_transcript(text, language_code, timings)
+
+def _voice_report(audio_data, voice, timings):
+    """Synthetic-voice report from the call's running analyzer, or from this clip alone."""
+    with telemetry.span("deepfake", timings):
+        if voice is not None:
+            return voice.report()
+        if audio_data is not None:
+            return deepfake.analyze(audio_data)
+    return None
+
+def score_audio(original_text, english_text, context=None, timings=None, started=None,
+                audio_data=None, voice=None):
+    """
+    Verdict stage of analyze_audio: classifies the transcript, screens the
+    voice for synthetic speech and logs the alert.
+    voice: the call's deepfake.VoiceAnalyzer when the audio is a stream.
+    Until deepfake.CALIBRATED is set the voice report is returned under
+    "deepfake" for information only and doesn't change the verdict.
     """
-    # 1. Content Analysis (STT + Text Model)
-    # If audio_file is a path or file-like object we can process
-    original_text, english_text = process_audio_input(audio_file, language)
-    
     content_result = {"is_scam": False, "reason": "Content seems safe"}
     
     if original_text and "Error" not in english_text:
         # Run the text analysis on the transcribed/translated text
-        content_result = analyze_text(english_text, context=context)
+        with telemetry.span("analyze_text", timings):
+            content_result = analyze_text(english_text, context=context)
         content_result["transcript"] = original_text
         content_result["translation"] = english_text
 
-    # 2. Deepfake Analysis (Mock for now, but linked to content)
-    # In a real app, this would check spectral features.
-    # For prototype, we'll assume high confidence if content is scammy.
-    
-    is_deepfake = False
-    deepfake_confidence = 10
-    
+    # 2. Deepfake Analysis (signal-level, independent of the words)
+    voice_report = _voice_report(audio_data, voice, timings)
+    voice_confidence = (voice_report or {}).get("confidence") if deepfake.CALIBRATED else None
+    is_deepfake = voice_confidence is not None and voice_confidence >= deepfake.ALERT_CONFIDENCE
+
+    # 3. Combine: once the voice cues are calibrated either signal can flag the call
+    content_p = content_result["confidence"] / 100 if content_result["is_scam"] else 0.0
+    voice_p = (voice_confidence or 0) / 100
+    confidence = int(round(100 * (1 - (1 - content_p) * (1 - voice_p))))
+    is_scam = content_result["is_scam"] or is_deepfake
+
+    alert = None
     if content_result["is_scam"]:
-        is_deepfake = True
-        deepfake_confidence = 88
         reason = f"Scam Content Detected in Audio: {content_result['reason']}"
+        if is_deepfake:
+            reason += f" The voice also sounds computer-generated ({voice_confidence}%)."
+        alert = ("Audio Call", "High", reason, "Blocked")
+    elif is_deepfake:
+        reason = (f"🤖 **Voice Warning**: This voice shows signs of being computer-generated "
+                  f"({voice_confidence}%). Call the person back on a number you know.")
+        alert = ("Audio Call", "Medium", reason, "Flagged")
     else:
         reason = "Audio seems natural."
 
     # Log to DB
-    if is_deepfake:
-        db.log_alert("Audio Call", "High", reason, "Blocked")
+    if alert:
+        with telemetry.span("log_alert", timings):
+            db.log_alert(*alert, message=content_result.get("translation"),
+                         user=(context or {}).get('user'), sender=(context or {}).get('sender'))
 
-    return {
-        "is_scam": is_deepfake,
+    telemetry.inc("safeecho_verdicts_total", kind="audio", scam=is_scam)
+    result = {
+        "is_scam": is_scam,
         "reason": reason,
-        "confidence": deepfake_confidence,
+        "confidence": confidence,
+        "deepfake": voice_report,
         "content_analysis": content_result
     }
+    if timings is not None:
+        if started is not None:
+            timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+        result["timings"] = timings
+    return result
+
+def analyze_audio(audio_file, language="English", context=None, session=None, voice=None):
+    """
+    Analyzes audio for deepfakes AND content scams.
+    session: RecognizerSession of the caller/device the audio comes from.
+    voice: deepfake.VoiceAnalyzer already fed with the call's stream; its
+    running verdict is used instead of screening this clip alone.
+    """
+    started = time.perf_counter()
+    timings = telemetry.timings_for(context)
+    
+    # 1. Content Analysis (STT + Text Model)
+    # If audio_file is a path or file-like object we can process
+    audio_data, original_text, error = load_and_transcribe(audio_file, language, timings, session)
+    english_text = error if original_text is None else translate_transcript(original_text, language, timings)
+    
+    # 2. Deepfake Analysis and verdict
+    return score_audio(original_text, english_text, context, timings, started, audio_data, voice)
@@ -0,0 +1,152 @@
+import functools
+import queue
+import threading
+import time
+
+import speech_recognition as sr
+
+import deepfake
+import guardian
+import telemetry
+
+
+class LiveMonitor:
+    """
+    Pipelined continuous monitor.
+
+    capture thread -> bounded queue -> worker pool -> in-order results
+
+    The capture thread only reads the microphone, so speech keeps being
+    recorded while earlier chunks are transcribed, translated and
+    classified. Each chunk is analyzed together with the last
+    overlap_seconds of the previous one, so a phrase cut at a chunk
+    boundary ("gift" | "card") is still heard whole.
+
+    session is the device's RecognizerSession: its recognizer listens, and
+    the capture thread updates its noise profile from every raw chunk
+    between listen() calls. The capture thread also feeds every chunk, once
+    and in order, to a deepfake.VoiceAnalyzer, so the voice verdict builds
+    up over the whole call.
+    """
+
+    def __init__(self, session, source, language="English", context=None, workers=3,
+                 max_pending=8, phrase_time_limit=5, overlap_seconds=1.0, analyze=None):
+        self.session = session
+        self.recognizer = session.recognizer
+        self.source = source
+        self.language = language
+        self.context = context
+        self.workers = workers
+        self.phrase_time_limit = phrase_time_limit
+        self.overlap_seconds = overlap_seconds
+        self.voice = None
+        self.analyze = analyze or functools.partial(self._analyze, session=session)
+        self.dropped = 0
+
+        self._chunks = queue.Queue(maxsize=max_pending)
+        self._results = {}
+        self._next_seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _analyze(self, audio, **kwargs):
+        return guardian.analyze_audio(audio, voice=self.voice, **kwargs)
+
+    # Stages
+    def _window(self, previous, audio):
+        """audio with the tail of the previous chunk prepended."""
+        if previous is None or self.overlap_seconds <= 0:
+            return audio
+        if (previous.sample_rate, previous.sample_width) != (audio.sample_rate, audio.sample_width):
+            return audio
+        tail_bytes = int(self.overlap_seconds * audio.sample_rate) * audio.sample_width
+        tail = previous.frame_data[-tail_bytes:]
+        return sr.AudioData(tail + audio.frame_data, audio.sample_rate, audio.sample_width)
+
+    def _capture(self):
+        seq = 0
+        previous = None
+        while not self._stop.is_set():
+            try:
+                # Short timeout so stop() is noticed even in silence
+                audio = self.recognizer.listen(self.source, timeout=1, phrase_time_limit=self.phrase_time_limit)
+            except sr.WaitTimeoutError:
+                continue
+            except Exception as e:
+                self._publish(seq, {"error": f"Capture error: {e}"})
+                self._stop.set()
+                break
+
+            self.session.observe(audio)
+            if self.voice is None:
+                self.voice = deepfake.VoiceAnalyzer(audio.sample_rate)
+            self.voice.feed(audio)
+
+            item = (seq, time.perf_counter(), self._window(previous, audio))
+            previous = audio
+            seq += 1
+            try:
+                self._chunks.put(item, timeout=0.5)
+            except queue.Full:
+                # Workers can't keep up: drop the oldest pending chunk, never the microphone
+                try:
+                    old_seq, _, _ = self._chunks.get_nowait()
+                    self._publish(old_seq, None)
+                    self.dropped += 1
+                    telemetry.inc("safeecho_monitor_dropped_total")
+                except queue.Empty:
+                    pass
+                self._chunks.put(item)
+
+        # Wake every worker
+        for _ in range(self.workers):
+            self._chunks.put(None)
+
+    def _work(self):
+        while True:
+            item = self._chunks.get()
+            if item is None:
+                return
+            seq, captured_at, audio = item
+            try:
+                result = self.analyze(audio, language=self.language, context=self.context)
+            except Exception as e:
+                result = {"error": f"Analysis error: {e}"}
+            telemetry.observe("safeecho_monitor_latency_seconds", time.perf_counter() - captured_at)
+            self._publish(seq, result)
+
+    def _publish(self, seq, result):
+        with self._cond:
+            self._results[seq] = result
+            self._cond.notify_all()
+
+    # Control
+    def start(self):
+        self._threads = [threading.Thread(target=self._capture, name="monitor-capture", daemon=True)]
+        self._threads += [threading.Thread(target=self._work, name=f"monitor-worker-{i}", daemon=True)
+                          for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+    def results(self, poll=0.5):
+        """
+        Yields analysis results in capture order until stopped.
+        Dropped chunks are skipped; an {"error": ...} result ends capture.
+        """
+        while True:
+            with self._cond:
+                while self._next_seq not in self._results:
+                    if self._stop.is_set() and not any(t.is_alive() for t in self._threads):
+                        return
+                    self._cond.wait(timeout=poll)
+                result = self._results.pop(self._next_seq)
+                self._next_seq += 1
+            if result is not None:
+                yield result
@@ -0,0 +1,227 @@
+import itertools
+import os
+import threading
+import time
+
+import joblib
+
+import compact_model
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Versioned artifacts live side by side as models/text_model-<version>.pkl
+# (or .npz for compact_model exports); models/ACTIVE names the one to serve.
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+ACTIVE_FILE = "ACTIVE"
+ARTIFACT_PREFIX = "text_model-"
+ARTIFACT_SUFFIX = ".pkl"
+COMPACT_SUFFIX = ".npz"
+
+# Original single artifact, served as version "legacy" until a versioned one exists.
+LEGACY_MODEL_FILE = os.path.join(BASE_DIR, "text_model.pkl")
+LEGACY_VERSION = "legacy"
+
+
+class ModelLoadError(Exception):
+    """A model artifact could not be loaded or failed validation."""
+
+
+class LoadedModel:
+    """
+    An immutable, validated model snapshot.
+    Callers take one snapshot per request and use it throughout, so a swap
+    in the middle of a request never mixes two models.
+    """
+
+    _serial = itertools.count(1)
+
+    def __init__(self, version, path, pipeline):
+        self.version = version
+        self.path = path
+        self.pipeline = pipeline
+        self.classes = list(pipeline.classes_)
+        self.scam_idx = self.classes.index('scam')
+        # Unique per load, so caches can tell a reload of the same version apart
+        self.token = (version, next(LoadedModel._serial))
+
+    def predict_proba(self, texts):
+        """Scam probability for each text."""
+        return self.pipeline.predict_proba(texts)[:, self.scam_idx]
+
+
+class ModelRegistry:
+    """
+    Loads models on first use and swaps to new versions atomically.
+    A failed load leaves the current model in place and raises ModelLoadError.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, legacy_path=LEGACY_MODEL_FILE, check_interval=2.0):
+        self.model_dir = model_dir
+        self.legacy_path = legacy_path
+        self.check_interval = check_interval
+        self._active = None
+        self._active_signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    # Artifacts
+    def artifact_path(self, version):
+        if version == LEGACY_VERSION:
+            return self.legacy_path
+        compact = os.path.join(self.model_dir, f"{ARTIFACT_PREFIX}{version}{COMPACT_SUFFIX}")
+        if os.path.exists(compact):
+            return compact
+        return os.path.join(self.model_dir, f"{ARTIFACT_PREFIX}{version}{ARTIFACT_SUFFIX}")
+
+    def versions(self):
+        """Available versions, oldest first."""
+        found = []
+        if os.path.isdir(self.model_dir):
+            for name in os.listdir(self.model_dir):
+                for suffix in (ARTIFACT_SUFFIX, COMPACT_SUFFIX):
+                    if name.startswith(ARTIFACT_PREFIX) and name.endswith(suffix):
+                        found.append(name[len(ARTIFACT_PREFIX):-len(suffix)])
+        found = sorted(set(found))
+        if os.path.exists(self.legacy_path):
+            found.insert(0, LEGACY_VERSION)
+        return found
+
+    def _wanted_version(self):
+        """Version named by the ACTIVE pointer, else the newest artifact."""
+        try:
+            with open(os.path.join(self.model_dir, ACTIVE_FILE)) as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except OSError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def _signature(self, version):
+        """Changes whenever the pointer or the artifact it names changes."""
+        parts = [version]
+        for path in (os.path.join(self.model_dir, ACTIVE_FILE), self.artifact_path(version)):
+            try:
+                st = os.stat(path)
+                parts.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                parts.append(None)
+        return tuple(parts)
+
+    # Loading
+    def _load(self, version):
+        path = self.artifact_path(version)
+        try:
+            if path.endswith(COMPACT_SUFFIX):
+                pipeline = compact_model.load(path)
+            else:
+                pipeline = joblib.load(path)
+            loaded = LoadedModel(version, path, pipeline)
+            # Smoke test before it can serve traffic
+            probs = loaded.predict_proba(["hello, are we still on for dinner?"])
+            if len(probs) != 1 or not 0.0 <= float(probs[0]) <= 1.0:
+                raise ValueError("predict_proba returned an invalid score")
+            return loaded
+        except Exception as e:
+            raise ModelLoadError(f"Could not load model version '{version}' from {path}: {e}") from e
+
+    def load(self, version):
+        """Load and validate a version without serving it."""
+        return self._load(version)
+
+    def activate(self, version, persist=True):
+        """
+        Load, validate and swap to version. On failure the previous model
+        keeps serving and ModelLoadError is raised.
+        """
+        loaded = self._load(version)
+        with self._lock:
+            if persist and version != LEGACY_VERSION:
+                os.makedirs(self.model_dir, exist_ok=True)
+                pointer = os.path.join(self.model_dir, ACTIVE_FILE)
+                tmp = f"{pointer}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(version)
+                os.replace(tmp, pointer)
+            self._active = loaded
+            self._active_signature = self._signature(version)
+            self._last_check = time.monotonic()
+        return loaded
+
+    def publish(self, pipeline, version=None, activate=True):
+        """
+        Write pipeline (or a compact_model.CompactModel) as a new versioned
+        artifact and (by default) activate it.
+        """
+        version = version or time.strftime("%Y%m%d-%H%M%S")
+        os.makedirs(self.model_dir, exist_ok=True)
+        compact = isinstance(pipeline, compact_model.CompactModel)
+        suffix = COMPACT_SUFFIX if compact else ARTIFACT_SUFFIX
+        path = os.path.join(self.model_dir, f"{ARTIFACT_PREFIX}{version}{suffix}")
+        tmp = f"{path}.tmp"
+        if compact:
+            with open(tmp, "wb") as f:
+                pipeline.save(f)
+        else:
+            joblib.dump(pipeline, tmp)
+        os.replace(tmp, path)
+        if activate:
+            self.activate(version)
+        return version
+
+    def current(self):
+        """
+        The model to use for this request (None if no artifact exists yet).
+        Loads on first use and picks up newly published versions.
+        """
+        if self._active is None:
+            with self._lock:
+                if self._active is None:
+                    version = self._wanted_version()
+                    if version is None:
+                        return None
+                    self._active = self._load(version)
+                    self._active_signature = self._signature(version)
+                    self._last_check = time.monotonic()
+        elif time.monotonic() - self._last_check > self.check_interval:
+            self.refresh()
+        return self._active
+
+    def refresh(self):
+        """
+        Swap to the version on disk if it changed. Never blocks serving: if
+        another thread is already reloading this returns straight away.
+        """
+        if not self._lock.acquire(blocking=False):
+            return self._active
+        try:
+            self._last_check = time.monotonic()
+            version = self._wanted_version()
+            if version is None:
+                return self._active
+            signature = self._signature(version)
+            if signature == self._active_signature:
+                return self._active
+            try:
+                self._active = self._load(version)
+            except ModelLoadError as e:
+                # Roll back: keep serving the model we already have
+                print(f"Model reload failed, keeping version '{self._active.version if self._active else None}': {e}")
+            self._active_signature = signature
+            return self._active
+        finally:
+            self._lock.release()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Return the shared ModelRegistry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,328 @@
+import hashlib
+import math
+import re
+import threading
+
+import telemetry
+
+# An entity (phone number, URL domain or sender) is known-bad once it was
+# seen in MIN_SCAM_REPORTS scam messages, with at most MAX_SAFE_SHARE of its
+# sightings in safe ones.
+MIN_SCAM_REPORTS = 2
+MAX_SAFE_SHARE = 0.1
+
+# A known-bad entity with KNOWN_SCAM_REPORTS scam sightings and no safe one
+# is a known scammer: its messages are blocked without being scored.
+KNOWN_SCAM_REPORTS = 5
+
+# Only labelled data is evidence: the training corpora and scam alerts a
+# caregiver confirmed. The detector's own verdicts are never recorded, or
+# its mistakes would feed back into its next verdicts.
+
+BLOOM_ERROR_RATE = 0.001
+
+# Entities tracked at most; past it, those without a verdict are dropped
+# (first seen, first dropped).
+MAX_ENTITIES = 200_000
+
+# Shared infrastructure that scams quote or link through as often as
+# anyone: mail providers, URL shorteners, large platforms, and carriers and
+# banks that scams impersonate. A sighting says nothing about the next
+# message naming them, so they are never indexed.
+SHARED_DOMAINS = frozenset({
+    # Mail
+    "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.in", "yahoo.co.uk", "hotmail.com",
+    "hotmail.co.uk", "outlook.com", "live.com", "msn.com", "aol.com", "icloud.com", "me.com",
+    "rediffmail.com", "protonmail.com", "gmx.com", "mail.com",
+    # URL shorteners and link hubs
+    "bit.ly", "bitly.com", "tinyurl.com", "goo.gl", "t.co", "ow.ly", "is.gd", "buff.ly", "rb.gy",
+    "cutt.ly", "shorturl.at", "tiny.cc", "t.ly", "lnkd.in", "wa.me", "linktr.ee",
+    # Platforms
+    "google.com", "youtube.com", "facebook.com", "instagram.com", "whatsapp.com", "twitter.com",
+    "x.com", "linkedin.com", "microsoft.com", "apple.com", "amazon.com", "amazon.in", "amazon.co.uk",
+    "paypal.com", "netflix.com", "bloomberg.com",
+    # Carriers, banks and wallets
+    "o2.co.uk", "vodafone.co.uk", "ee.co.uk", "three.co.uk", "bt.com", "nationwide.co.uk",
+    "airtel.in", "jio.com", "vodafone.in", "paytm.com", "paytm.me", "phonepe.com",
+    "onlinesbi.com", "sbi.co.in", "hdfcbank.com", "icicibank.com", "axisbank.com",
+})
+# Public-sector and academic domains (gov.uk, hmrc.gov.uk, india.nic.in, ...)
+SHARED_SUFFIXES = (".gov", ".gov.uk", ".gov.in", ".nic.in", ".gov.au", ".gc.ca", ".mil", ".edu",
+                   ".ac.uk", ".ac.in", ".nhs.uk")
+
+_URL = re.compile(
+    r"(?i)\b(?:https?://|www\.)[^\s<>\"']+"
+    r"|\b(?:[a-z0-9-]+\.)+(?:com|net|org|info|biz|co|in|uk|io|ly|me|gl|xyz|top|club|online|site|link|app)\b"
+)
+_PHONE = re.compile(r"\+?\d(?:[\s.-]?\d){6,14}")
+_SHORT_CODE = re.compile(r"(?i)\b(?:to|on|call|txt|text|sms|ring)\s+(\d{5,6})\b")
+# Second-level labels under which domains are registered (example.co.uk)
+_SECOND_LEVEL = {"co", "com", "org", "net", "gov", "ac", "edu"}
+# Operator/circle prefix of Indian SMS headers (VM-HDFCBK, AD-HDFCBK)
+_HEADER_PREFIX = re.compile(r"^[a-z]{2}-")
+
+
+def normalize_phone(number):
+    """National part of a phone number (last 10 digits), or a 5-6 digit short code."""
+    digits = re.sub(r"\D", "", number)
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if len(digits) < 5:
+        return None
+    return digits[-10:]
+
+def normalize_domain(url):
+    """Registrable domain of a URL: 'https://Secure.HDFC-update.co.in/x' -> 'hdfc-update.co.in'."""
+    host = re.sub(r"(?i)^[a-z]+://", "", url).split("/")[0].split("?")[0].split("#")[0]
+    host = host.split("@")[-1].split(":")[0].strip(".").lower()
+    parts = [p for p in host.split(".") if p]
+    if len(parts) < 2 or not re.fullmatch(r"[a-z]{2,24}", parts[-1]):
+        return None
+    if len(parts) >= 3 and parts[-2] in _SECOND_LEVEL and len(parts[-1]) == 2:
+        return ".".join(parts[-3:])
+    return ".".join(parts[-2:])
+
+def is_shared_domain(domain):
+    return domain in SHARED_DOMAINS or ("." + domain).endswith(SHARED_SUFFIXES)
+
+def sender_key(sender):
+    """Index key of a message sender: its phone number, or its normalized address/header."""
+    if not sender:
+        return None
+    sender = str(sender).strip().lower()
+    if re.fullmatch(r"\+?[\d\s().-]+", sender):
+        phone = normalize_phone(sender)
+        return f"phone:{phone}" if phone else None
+    if "@" not in sender:
+        sender = re.sub(r"[^a-z0-9]", "", _HEADER_PREFIX.sub("", sender))
+    return f"sender:{sender}" if sender else None
+
+def text_keys(text):
+    """Index keys of the phone numbers and URL domains (except shared ones) in a message."""
+    keys = set()
+    for match in _URL.finditer(text):
+        domain = normalize_domain(match.group(0))
+        if domain and not is_shared_domain(domain):
+            keys.add(f"domain:{domain}")
+    for match in _PHONE.finditer(text):
+        raw = match.group(0)
+        digits = re.sub(r"\D", "", raw)
+        # Long enough to be a number rather than an amount or a date
+        if len(digits) >= 10 or (raw[0] in "+0" and len(digits) >= 7):
+            keys.add(f"phone:{normalize_phone(raw)}")
+    for match in _SHORT_CODE.finditer(text):
+        keys.add(f"phone:{match.group(1)}")
+    return keys
+
+def describe(key):
+    kind, _, value = key.partition(":")
+    if kind == "phone":
+        return f"The number {value}"
+    if kind == "domain":
+        return f"The website {value}"
+    return "This sender"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (double hashing over one blake2b digest)."""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class ReputationIndex:
+    """
+    Scam/safe sighting counts per normalized phone number, URL domain and
+    sender, with a Bloom filter over the entities that have a verdict.
+    Most messages mention nothing the index knows, and the filter answers
+    those without touching the counts.
+    """
+
+    def __init__(self, max_entities=MAX_ENTITIES):
+        self.max_entities = max_entities
+        self.counts = {}
+        self.bloom = BloomFilter(1024)
+        self._lock = threading.Lock()
+
+    def _verdict(self, key):
+        scam, safe = self.counts.get(key, (0, 0))
+        if scam >= KNOWN_SCAM_REPORTS and safe == 0:
+            return "known"
+        if scam >= MIN_SCAM_REPORTS and safe <= MAX_SAFE_SHARE * (scam + safe):
+            return "bad"
+        return None
+
+    def _add(self, keys, scam):
+        for key in keys:
+            had = self._verdict(key)
+            counts = self.counts.setdefault(key, [0, 0])
+            counts[0 if scam else 1] += 1
+            if had is None and self._verdict(key) is not None:
+                if self.bloom.count >= self.bloom.capacity:
+                    self._rebuild_bloom(2 * self.bloom.capacity)
+                self.bloom.add(key)
+        if len(self.counts) > self.max_entities:
+            self._prune()
+
+    def _prune(self):
+        """Shrink to 90% of max_entities: entities without a verdict first, then the oldest."""
+        excess = len(self.counts) - int(self.max_entities * 0.9)
+        for key in [k for k in self.counts if self._verdict(k) is None][:excess]:
+            del self.counts[key]
+        excess = len(self.counts) - int(self.max_entities * 0.9)
+        if excess > 0:
+            for key in list(self.counts)[:excess]:
+                del self.counts[key]
+            self._rebuild_bloom(self.bloom.capacity)
+
+    def _rebuild_bloom(self, capacity):
+        bloom = BloomFilter(capacity)
+        for key in self.counts:
+            if self._verdict(key) is not None:
+                bloom.add(key)
+        self.bloom = bloom
+
+    def record(self, text, sender=None, scam=True):
+        """Count one message (its sender, numbers and domains) as a scam or safe sighting."""
+        keys = text_keys(text or "")
+        key = sender_key(sender)
+        if key:
+            keys.add(key)
+        with self._lock:
+            self._add(keys, scam)
+
+    def record_many(self, messages, scam=True):
+        """messages: iterable of (text, sender) pairs."""
+        with self._lock:
+            for text, sender in messages:
+                keys = text_keys(text or "")
+                key = sender_key(sender)
+                if key:
+                    keys.add(key)
+                self._add(keys, scam)
+            self._rebuild_bloom(max(1024, 2 * sum(1 for k in self.counts if self._verdict(k))))
+
+    def screen(self, text, sender=None):
+        """
+        ('known', key) if the sender or a number/domain in the text is a
+        known scammer, ('bad', key) if one is known-bad, otherwise (None, None).
+        """
+        keys = text_keys(text)
+        own = sender_key(sender)
+        if own:
+            keys.add(own)
+        bad = None
+        bloom = self.bloom
+        for key in sorted(keys):
+            if key not in bloom:
+                continue
+            verdict = self._verdict(key)
+            if verdict == "known":
+                return "known", key
+            if verdict == "bad" and bad is None:
+                bad = key
+        return ("bad", bad) if bad else (None, None)
+
+    def reports(self, key):
+        """Scam sightings of an entity."""
+        return self.counts.get(key, (0, 0))[0]
+
+    def stats(self):
+        with self._lock:
+            verdicts = [self._verdict(key) for key in self.counts]
+        return {"entities": len(verdicts), "known": verdicts.count("known"), "bad": verdicts.count("bad")}
+
+
+def build_index(corpus=None, users=None):
+    """
+    Index built from the training corpora (labelled messages) and the
+    caregiver-confirmed scam alerts of every protected user. High-risk
+    alerts the detector raised on its own are not evidence.
+    """
+    import db
+    from corpus import load_corpus
+
+    index = ReputationIndex()
+    df = load_corpus() if corpus is None else corpus
+    for label, scam in (("scam", True), ("safe", False)):
+        index.record_many(((text, None) for text in df.loc[df['label'] == label, 'text']), scam=scam)
+    for user in (users or db.list_users()):
+        reports = db.get_scam_reports(user=user, confirmed_only=True)
+        index.record_many(((message, sender) for _, message, sender in reports), scam=True)
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+_build_thread = None
+
+def get_index():
+    """The shared ReputationIndex; builds it (blocking) if it isn't built yet."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    with telemetry.span("reputation_build"):
+                        _index = build_index()
+                except Exception as e:
+                    # Start empty; caregiver confirmations still feed it
+                    print(f"Error building reputation index: {e}")
+                    _index = ReputationIndex()
+    return _index
+
+def start_build():
+    """Build the shared index on a background thread (once)."""
+    global _build_thread
+    with _index_lock:
+        if _index is not None or _build_thread is not None:
+            return
+        _build_thread = threading.Thread(target=get_index, name="reputation-build", daemon=True)
+        _build_thread.start()
+
+def ready_index():
+    """
+    The shared index if it is built, else None without waiting (and the
+    build is started in the background). The scoring path uses this so a
+    cold start never holds a message up for the build.
+    """
+    if _index is None:
+        start_build()
+    return _index
+
+def record_confirmed(alert_id, user=None):
+    """Count an alert a caregiver just confirmed as a scam sighting of its message and sender."""
+    import db
+
+    index = _index
+    if index is None:
+        # Not built yet; the build reads every confirmed alert
+        return
+    found = db.get_alert_message(alert_id, user=user)
+    if found is not None:
+        message, sender = found
+        index.record(message, sender, scam=True)
+
+def set_index(index):
+    """Replace the shared index (e.g. with an empty one in benchmarks)."""
+    global _index
+    _index = index
@@ -0,0 +1,108 @@
+import re
+
+# Explanation rules, in priority order: (category, explanation, keywords).
+# Target Audience: Ages 8-80.
+EXPLANATION_RULES = [
+    ("money", "⚠️ **Money Danger**: A stranger is asking you to send money. Real companies never ask for gift cards or wire transfers.",
+     ["western union", "gift card", "wire transfer"]),
+    ("account", "🛑 **Account Risk**: Someone is trying to steal your password. Never click links that ask you to log in.",
+     ["password", "verify", "login", "account is locked"]),
+    ("panic", "⏳ **Panic Trick**: Scammers use scary words like 'Urgent' or 'Jail' to make you act without thinking. Take a deep breath.",
+     ["urgent", "immediately", "warrant", "jail", "suspended"]),
+    ("romance", "💔 **Romance Scam**: Be careful when someone you met online asks for money. Real love doesn't cost $500.",
+     ["soulmate", "destiny", "love you", "my love"]),
+    ("investment", "💰 **Too Good To Be True**: If they promise you'll get rich quick, it's a lie. Keep your money safe.",
+     ["investment", "returns", "profit", "fund"]),
+    ("tech_support", "💻 **Fake Support**: Microsoft will never call or email you to fix your computer. Do not let them control your screen.",
+     ["security patch", "microsoft", "admin access", "virus"]),
+]
+
+# Fallback keywords, in reporting order
+SCAM_KEYWORDS = [
+    "urgent", "bank", "verify", "password", "ssn", "gift card", "compromised", "jail", "warrant",
+    "western union", "visa fee", "soulmate", "destiny", "flight delayed", "investment", "returns",
+    "ticker", "security patch", "admin access", "support line", "microsoft", "diagnostic tool",
+    "otp", "cvv", "lottery", "prize", "click here", "winner", "cash", "refund", "blocked",
+    "suspended", "kyc", "pan card", "aadhar", "sim card", "electricity", "ransom", "arrest",
+    "transfer", "upi", "gpay", "paytm", "lost phone", "new number"
+]
+
+# Reduced list for saved contacts: only very specific high-danger keywords
+SAVED_CONTACT_KEYWORDS = ["password", "ssn", "cvv", "otp"]
+
+
+def _trie_pattern(phrases):
+    """
+    Regex for a set of phrases, shaped like a trie so each text position is
+    tested once per character instead of once per phrase. Optional suffixes
+    are greedy, so the longest phrase at a position wins.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class RuleMatcher:
+    """
+    Every rule and keyword phrase compiled into one matcher.
+    scan() makes a single pass over the lowercased text and returns every
+    phrase it contains, with the same substring semantics as `x in text`.
+    """
+
+    def __init__(self, rules, keywords, saved_keywords):
+        self.rules = rules
+        self._keyword_rank = {word: i for i, word in enumerate(keywords)}
+        self._saved_rank = {word: i for i, word in enumerate(saved_keywords)}
+
+        phrases = set(keywords) | set(saved_keywords)
+        for _, _, rule_keywords in rules:
+            phrases.update(rule_keywords)
+
+        # A match only reports the longest phrase starting at each position,
+        # so expand it to every phrase it contains ("wire transfer" -> "transfer").
+        self._implied = {p: frozenset(q for q in phrases if q in p) for p in phrases}
+        self._pattern = re.compile(f"(?=({_trie_pattern(phrases)}))")
+
+    def scan(self, text):
+        """Set of all known phrases found in text."""
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found |= self._implied[match.group(1)]
+        return found
+
+    def explanation(self, found):
+        """Explanation of the highest-priority rule hit by found, or None."""
+        for _, explanation, rule_keywords in self.rules:
+            if not found.isdisjoint(rule_keywords):
+                return explanation
+        return None
+
+    def categories(self, found):
+        """Categories of every rule hit by found, in priority order."""
+        return [category for category, _, rule_keywords in self.rules if not found.isdisjoint(rule_keywords)]
+
+    def first_keyword(self, found, saved_contact=False):
+        """
+        First fallback keyword present in found, or None.
+        Saved contacts are filtered down to the reduced keyword list.
+        """
+        rank = self._saved_rank if saved_contact else self._keyword_rank
+        hits = [word for word in found if word in rank]
+        if not hits:
+            return None
+        return min(hits, key=rank.__getitem__)
+
+
+MATCHER = RuleMatcher(EXPLANATION_RULES, SCAM_KEYWORDS, SAVED_CONTACT_KEYWORDS)
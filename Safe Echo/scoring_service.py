@@ -0,0 +1,194 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import guardian
+import reputation
+import telemetry
+
+DEFAULT_PORT = 8080
+MAX_BATCH = 64
+MAX_WAIT_MS = 5.0
+MAX_QUEUE = 10000
+
+# Largest request body accepted (bytes)
+MAX_BODY = 64 * 1024
+
+
+class _Request:
+    __slots__ = ("text", "context", "enqueued", "done", "result", "error", "queue_ms", "compute_ms", "batch_size")
+
+    def __init__(self, text, context):
+        self.text = text
+        self.context = context
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-message requests into micro-batches.
+    A batch is scored as soon as max_batch requests are waiting, or
+    max_wait_ms after its first request arrived, with one
+    guardian.analyze_texts call (one vectorized predict_proba).
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, max_queue=MAX_QUEUE):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text, context=None, timeout=30):
+        """
+        Score one message; blocks until its batch is done.
+        Returns the request (result, queue_ms, compute_ms, batch_size).
+        Raises queue.Full when the service is overloaded.
+        """
+        request = _Request(text, context or {})
+        self._queue.put_nowait(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("scoring timed out")
+        if request.error is not None:
+            raise request.error
+        return request
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = first.enqueued + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._score(batch)
+
+    def _score(self, batch):
+        started = time.perf_counter()
+        try:
+            results = guardian.analyze_texts([r.text for r in batch], [r.context for r in batch])
+        except Exception as e:
+            telemetry.inc("safeecho_errors_total", stage="service_batch")
+            results = [None] * len(batch)
+            for request in batch:
+                request.error = e
+        finished = time.perf_counter()
+        telemetry.inc("safeecho_service_batches_total")
+        telemetry.inc("safeecho_service_requests_total", len(batch))
+        for request, result in zip(batch, results):
+            request.result = result
+            request.queue_ms = round((started - request.enqueued) * 1000, 3)
+            request.compute_ms = round((finished - started) * 1000, 3)
+            request.batch_size = len(batch)
+            request.done.set()
+
+
+class _ScoringHandler(BaseHTTPRequestHandler):
+    batcher = None
+
+    def _send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/metrics":
+            body = telemetry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/score":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self._send_json(413, {"error": "request too large"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            text = payload["text"]
+            if not isinstance(text, str):
+                raise ValueError("text must be a string")
+            given = payload.get("context") or {}
+            context = {"is_saved_contact": bool(given.get("is_saved_contact", False))}
+            if given.get("sender") is not None:
+                context["sender"] = str(given["sender"])[:256]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+
+        try:
+            request = self.batcher.submit(text, context)
+        except queue.Full:
+            telemetry.inc("safeecho_service_rejected_total")
+            self._send_json(503, {"error": "overloaded"}, [("Retry-After", "1")])
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, request.result, [
+            ("X-Queue-Time-Ms", str(request.queue_ms)),
+            ("X-Compute-Time-Ms", str(request.compute_ms)),
+            ("X-Batch-Size", str(request.batch_size)),
+        ])
+
+    def log_message(self, format, *args):
+        pass
+
+class ScoringServer(ThreadingHTTPServer):
+    # Bursts of concurrent clients are the point; the default backlog of 5 resets them
+    request_queue_size = 256
+    daemon_threads = True
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    """HTTP server for POST /score (plus GET /healthz and /metrics)."""
+    handler = type("ScoringHandler", (_ScoringHandler,), {"batcher": MicroBatcher(max_batch, max_wait_ms)})
+    return ScoringServer((host, port), handler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless SafeEcho text scoring service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="largest micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="how long a request may wait for its batch to fill")
+    args = parser.parse_args()
+
+    # Load the model and the reputation index before accepting traffic
+    guardian.current_model()
+    reputation.get_index()
+    server = make_server(args.host, args.port, args.max_batch, args.max_wait_ms)
+    print(f"Scoring service on http://{args.host}:{args.port}/score")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def segment_name(day):
+    return f"alerts-{day}.jsonl.gz"
+
+
+class SegmentStore:
+    """
+    Sealed, read-only day segments of the alert log:
+    <directory>/alerts-YYYY-MM-DD.jsonl.gz, one alert per line, oldest first.
+    Files are written to a temporary name and renamed into place, so a
+    reader never sees a half-written segment.
+    """
+
+    def __init__(self, directory, cache_size=8):
+        self.directory = directory
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, day):
+        return os.path.join(self.directory, segment_name(day))
+
+    def write_temp(self, day, alerts):
+        """Write alerts (dicts, oldest first) to a temporary file; returns its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.path(day) + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+        return tmp
+
+    def install(self, day, tmp):
+        """Atomically move a temporary segment into place."""
+        os.replace(tmp, self.path(day))
+        self._forget(day)
+
+    def discard(self, tmp):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    def read(self, day):
+        """Alerts of a sealed day, oldest first (recently read days are cached)."""
+        path = self.path(day)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._cache.get(day)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(day)
+                return cached[1]
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            alerts = [json.loads(line) for line in f if line.strip()]
+        with self._lock:
+            self._cache[day] = (mtime, alerts)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return alerts
+
+    def remove(self, day):
+        path = self.path(day)
+        if os.path.exists(path):
+            os.remove(path)
+        self._forget(day)
+
+    def _forget(self, day):
+        with self._lock:
+            self._cache.pop(day, None)
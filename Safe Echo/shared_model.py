@@ -0,0 +1,183 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+
+import numpy as np
+
+from compact_model import CompactModel
+from model_registry import MODEL_DIR, LoadedModel, ModelLoadError, get_registry
+
+# Set SAFEECHO_SHARED_MODEL=1 to make guardian workers serve the shared model.
+ENABLED = os.environ.get("SAFEECHO_SHARED_MODEL", "0") == "1"
+
+# Each published model is a generation: SHARED_DIR/gen-<n>/ holds one .npy
+# per array plus meta.json. GENERATION is an 8-byte counter that every
+# worker maps into memory; bumping it moves all of them to the new model on
+# their next request.
+SHARED_DIR = os.path.join(MODEL_DIR, "shared")
+GENERATION_FILE = "GENERATION"
+ARRAYS = ("terms", "weights", "idf", "norm_terms", "norm_idf")
+
+# Older generations kept on disk for workers still finishing a request
+KEEP_GENERATIONS = 2
+
+
+def generation_dir(directory, generation):
+    return os.path.join(directory, f"gen-{generation:08d}")
+
+def _counter_path(directory):
+    return os.path.join(directory, GENERATION_FILE)
+
+def read_generation(directory=SHARED_DIR):
+    """Current generation (0 if nothing was published yet)."""
+    try:
+        with open(_counter_path(directory), "rb") as f:
+            return struct.unpack("<Q", f.read(8))[0]
+    except (OSError, struct.error):
+        return 0
+
+
+def publish(model, version, directory=SHARED_DIR):
+    """
+    Write model as the next generation and switch every attached worker to it.
+    model: a CompactModel, or a fitted TF-IDF + linear pipeline (converted
+    without pruning, so it scores exactly like the original).
+    Meant for one publisher at a time (the trainer). Returns the generation.
+    """
+    if not isinstance(model, CompactModel):
+        model = CompactModel.from_pipeline(model, threshold=0.0)
+    os.makedirs(directory, exist_ok=True)
+    generation = read_generation(directory) + 1
+
+    # 1. Arrays and metadata into a temporary directory, then rename it into place
+    target = generation_dir(directory, generation)
+    tmp = f"{target}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in ARRAYS:
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(getattr(model, name)))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": version, "classes": [str(c) for c in model.classes_],
+                   "intercept": model.intercept, "settings": model.settings}, f)
+    os.replace(tmp, target)
+
+    # 2. Bump the counter in place (workers have it mapped, so no rename)
+    path = _counter_path(directory)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(struct.pack("<Q", 0))
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 8) as counter:
+        struct.pack_into("<Q", counter, 0, generation)
+        counter.flush()
+
+    # 3. Drop generations nobody should still be using
+    for name in os.listdir(directory):
+        if name.startswith("gen-") and not name.endswith(".tmp"):
+            if int(name[4:]) <= generation - KEEP_GENERATIONS:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return generation
+
+
+def attach(directory, generation):
+    """
+    Map one generation read-only. The arrays are np.memmap views over the
+    page cache, so every worker attached to it shares the same physical pages.
+    """
+    path = generation_dir(directory, generation)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+    model = CompactModel(meta["classes"], meta["intercept"], settings=meta["settings"], **arrays)
+    return meta["version"], path, model
+
+
+class SharedModelReader:
+    """
+    Serves the shared model with the ModelRegistry current()/refresh()
+    interface. Checking for a new generation is one read of the mapped
+    counter, so workers switch on their next request without polling the
+    filesystem. Until a generation is published (or if the first one can't
+    be attached) the fallback registry's model is served.
+    """
+
+    def __init__(self, directory=SHARED_DIR, check_interval=2.0, fallback=None):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.fallback = fallback
+        self.generation = 0
+        self._active = None
+        self._counter = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _map_counter(self):
+        """Map the counter once it exists (checked every check_interval until then)."""
+        if time.monotonic() - self._last_check < self.check_interval:
+            return None
+        self._last_check = time.monotonic()
+        try:
+            with open(_counter_path(self.directory), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 8, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        self._counter = np.frombuffer(mapped, dtype="<u8", count=1)
+        return self._counter
+
+    def current(self):
+        """The model to use for this request (None if neither a generation nor a fallback model exists)."""
+        self._check()
+        if self._active is None and self.fallback is not None:
+            return self.fallback.current()
+        return self._active
+
+    def refresh(self):
+        """Check for a new generation now instead of on the next interval. Returns the model to use."""
+        self._last_check = 0.0
+        self._check()
+        if self._active is None and self.fallback is not None:
+            return self.fallback.refresh()
+        return self._active
+
+    def _check(self):
+        counter = self._counter if self._counter is not None else self._map_counter()
+        if counter is None:
+            return
+        generation = int(counter[0])
+        if generation != self.generation:
+            with self._lock:
+                if generation != self.generation:
+                    self._swap(generation)
+
+    def _swap(self, generation):
+        try:
+            version, path, model = attach(self.directory, generation)
+            loaded = LoadedModel(version, path, model)
+            probs = loaded.predict_proba(["hello, are we still on for dinner?"])
+            if len(probs) != 1 or not 0.0 <= float(probs[0]) <= 1.0:
+                raise ValueError("predict_proba returned an invalid score")
+        except Exception as e:
+            error = ModelLoadError(f"Could not attach shared model generation {generation}: {e}")
+            if self._active is None and self.fallback is None:
+                raise error from e
+            # Keep serving the generation (or the fallback model) we already have
+            print(f"{error}; keeping {f'generation {self.generation}' if self._active else 'the registry model'}")
+        else:
+            self._active = loaded
+        self.generation = generation
+
+
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_reader():
+    """Return the process-wide SharedModelReader."""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                _reader = SharedModelReader(fallback=get_registry())
+    return _reader
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import speech_recognition as sr
+
+import telemetry
+
+# Map UI languages to Google Speech API codes
+LANG_MAP = {
+    "English": "en-US",
+    "Hindi": "hi-IN",
+    "Marathi": "mr-IN"
+}
+
+
+# Speech-to-text backends
+class SpeechBackend:
+    """
+    Speech-to-text interface. transcribe() returns the text or raises
+    sr.UnknownValueError (no speech) / sr.RequestError (service failure),
+    the same contract as speech_recognition's recognize_* methods.
+    """
+
+    name = "base"
+
+    def transcribe(self, audio_data, language="English"):
+        raise NotImplementedError
+
+
+class GoogleSpeechBackend(SpeechBackend):
+    """Google Web Speech API via speech_recognition (needs network)."""
+
+    name = "google"
+
+    def __init__(self):
+        self._recognizer = sr.Recognizer()
+
+    def transcribe(self, audio_data, language="English"):
+        # show_all=False returns just the text
+        return self._recognizer.recognize_google(audio_data, language=LANG_MAP.get(language, "en-US"))
+
+
+def audio_key(audio_data):
+    """Content fingerprint of an AudioData clip."""
+    return hashlib.blake2b(audio_data.frame_data, digest_size=16).digest()
+
+class OfflineSpeechBackend(SpeechBackend):
+    """
+    Local stand-in for testing throughput without the network.
+    Returns transcripts registered for a clip (by content fingerprint);
+    unknown clips raise sr.UnknownValueError like unintelligible audio.
+    latency simulates a service round trip.
+    """
+
+    name = "offline"
+
+    def __init__(self, transcripts=None, latency=0.0):
+        self.latency = latency
+        self._transcripts = {}
+        for audio_data, text in (transcripts or []):
+            self.register(audio_data, text)
+
+    def register(self, audio_data, text):
+        self._transcripts[audio_key(audio_data)] = text
+
+    def transcribe(self, audio_data, language="English"):
+        if self.latency:
+            time.sleep(self.latency)
+        text = self._transcripts.get(audio_key(audio_data))
+        if text is None:
+            raise sr.UnknownValueError()
+        return text
+
+
+def _backend_from_env():
+    return OfflineSpeechBackend() if os.environ.get("SAFEECHO_STT_BACKEND") == "offline" else GoogleSpeechBackend()
+
+_default_backend = None
+
+def get_default_backend():
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = _backend_from_env()
+    return _default_backend
+
+def set_default_backend(backend):
+    """Backend used by sessions created without an explicit one."""
+    global _default_backend
+    _default_backend = backend
+
+
+# Noise floor
+def rms(audio_data, seconds=None):
+    """RMS energy of the first `seconds` of a clip (whole clip if None)."""
+    width = audio_data.sample_width
+    raw = audio_data.frame_data
+    if seconds is not None:
+        raw = raw[:int(seconds * audio_data.sample_rate) * width]
+    if width == 2:
+        # Zero-copy view over the raw buffer
+        samples = np.frombuffer(raw[:len(raw) - len(raw) % 2], dtype=np.int16)
+    else:
+        samples = np.frombuffer(sr.AudioData(raw, audio_data.sample_rate, width).get_raw_data(convert_width=2), dtype=np.int16)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+class RecognizerSession:
+    """
+    A caller's or device's recognizer and its calibrated energy threshold.
+    Instead of running adjust_for_ambient_noise (0.5s of fixed latency) on
+    every clip, the noise floor is measured from the start of each phrase
+    the recognizer captures (listen() keeps the quiet lead-in before the
+    speech) and the recognizer is only recalibrated when it drifts by more
+    than drift_ratio. The threshold only matters to listen(), so files are
+    never calibrated.
+    """
+
+    def __init__(self, key, backend=None, drift_ratio=1.5, probe_seconds=0.25):
+        self.key = key
+        self.backend = backend or get_default_backend()
+        self.drift_ratio = drift_ratio
+        self.probe_seconds = probe_seconds
+        self.noise_floor = None
+        self.recalibrations = 0
+
+        self.recognizer = sr.Recognizer()
+        # Settings for low-quality audio
+        self.recognizer.energy_threshold = 300  # Lower threshold for quiet voices
+        self.recognizer.dynamic_energy_threshold = True
+        self.recognizer.pause_threshold = 0.8
+
+    def calibrate(self, source, duration=1):
+        """Live sources: full ambient-noise calibration, only the first time."""
+        if self.noise_floor is None:
+            with telemetry.span("adjust_for_ambient_noise"):
+                self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+            self.noise_floor = self.recognizer.energy_threshold / self.recognizer.dynamic_energy_ratio
+            self.recalibrations += 1
+
+    def observe(self, audio_data):
+        """
+        Track the noise floor from a phrase just captured by listen();
+        recalibrate only on drift. Call it from the capturing thread, between
+        listen() calls.
+        """
+        floor = max(rms(audio_data, self.probe_seconds), 1.0)
+        if self.noise_floor is not None and 1 / self.drift_ratio <= floor / self.noise_floor <= self.drift_ratio:
+            return False
+        self.noise_floor = floor
+        self.recognizer.energy_threshold = max(floor * self.recognizer.dynamic_energy_ratio, 300)
+        self.recalibrations += 1
+        telemetry.inc("safeecho_stt_recalibrations_total")
+        return True
+
+    def load(self, audio_file, timings=None):
+        """AudioData for a path / file-like object (or an AudioData as is)."""
+        if isinstance(audio_file, sr.AudioData):
+            audio_data = audio_file
+        else:
+            with telemetry.span("record", timings):
+                with sr.AudioFile(audio_file) as source:
+                    audio_data = self.recognizer.record(source)
+        return audio_data
+
+    def transcribe(self, audio_data, language="English", timings=None):
+        with telemetry.span("speech_to_text", timings):
+            return self.backend.transcribe(audio_data, language)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(key="default", backend=None):
+    """The RecognizerSession for a caller/device key, created on first use."""
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = RecognizerSession(key, backend)
+    return session
+
+def reset_sessions():
+    with _sessions_lock:
+        _sessions.clear()
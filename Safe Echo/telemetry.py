@@ -0,0 +1,219 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set SAFEECHO_TELEMETRY=0 to turn every span and counter into a no-op.
+ENABLED = os.environ.get("SAFEECHO_TELEMETRY", "1") != "0"
+
+# Attach a per-stage timing breakdown to every result (or per call with
+# context={'timings': True}).
+BREAKDOWN = os.environ.get("SAFEECHO_TIMINGS", "0") == "1"
+
+# Set SAFEECHO_METRICS_PORT (e.g. 9108) to serve /metrics from the app
+# process. scoring_service.py always serves it on its own port.
+METRICS_PORT = os.environ.get("SAFEECHO_METRICS_PORT")
+
+# Stage latency buckets, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = "safeecho_stage_seconds"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_sink = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc(name, value=1, **labels):
+    """Add value to a counter."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    """Record value (seconds) in a histogram."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+class span:
+    """
+    Times one pipeline stage:
+
+        with telemetry.span("predict_proba", timings):
+            ...
+
+    The duration goes into the safeecho_stage_seconds histogram, the JSONL
+    sink (if set) and, when timings is a dict, timings[stage] in ms.
+    """
+
+    __slots__ = ("stage", "timings", "started")
+
+    def __init__(self, stage, timings=None):
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        if self.timings is not None:
+            self.timings[self.stage] = round(elapsed * 1000, 3)
+        if ENABLED:
+            observe(STAGE_METRIC, elapsed, stage=self.stage)
+            if _sink is not None:
+                _sink.write({"ts": time.time(), "stage": self.stage, "ms": round(elapsed * 1000, 3),
+                             "error": exc_type.__name__ if exc_type else None})
+        return False
+
+def timings_for(context=None):
+    """A dict to collect a timing breakdown into, or None if breakdowns are off."""
+    if BREAKDOWN or (context or {}).get('timings'):
+        return {}
+    return None
+
+
+# JSONL sink
+class JsonlSink:
+    """Appends one JSON object per span to a file (buffered, flushed at exit)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, record):
+        line = json.dumps(record)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+def set_jsonl_sink(path):
+    """Send every span to path as JSON lines (None to stop)."""
+    global _sink
+    old, _sink = _sink, (JsonlSink(path) if path else None)
+    if old is not None:
+        old.close()
+
+if os.environ.get("SAFEECHO_TELEMETRY_JSONL"):
+    set_jsonl_sink(os.environ["SAFEECHO_TELEMETRY_JSONL"])
+
+
+# Export
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def render_prometheus():
+    """All counters and histograms in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (list(h.counts), h.sum, h.count, h.buckets)) for key, h in _histograms.items())
+
+    lines = []
+    declared = set()
+    for (name, labels), value in counters:
+        if name not in declared:
+            lines.append(f"# TYPE {name} counter")
+            declared.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), (counts, total, count, buckets) in histograms:
+        if name not in declared:
+            lines.append(f"# TYPE {name} histogram")
+            declared.add(name)
+        cumulative = 0
+        for bound, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """Counters and per-stage histogram summaries as plain dicts."""
+    with _lock:
+        return {
+            "counters": {f"{name}{_format_labels(labels)}": value for (name, labels), value in _counters.items()},
+            "histograms": {
+                f"{name}{_format_labels(labels)}": {"count": h.count, "sum": h.sum}
+                for (name, labels), h in _histograms.items()
+            },
+        }
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port=9108, host="0.0.0.0"):
+    """Serve /metrics for Prometheus on a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_configured_server():
+    """start_http_server() on SAFEECHO_METRICS_PORT, if set. Returns the server or None."""
+    if not METRICS_PORT:
+        return None
+    try:
+        return start_http_server(int(METRICS_PORT))
+    except (OSError, ValueError) as e:
+        print(f"Error starting metrics server on port {METRICS_PORT}: {e}")
+        return None
@@ -1,71 +1,79 @@
+import argparse
+import json
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import SGDClassifier
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import ComplementNB
 from sklearn.pipeline import make_pipeline
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
+from sklearn.metrics import accuracy_score, classification_report, f1_score
 import joblib
 import os
+import db
+from compact_model import PRUNE_THRESHOLD, CompactModel
+from corpus import BASE_DIR, load_corpus, read_new_scams
+from model_registry import LEGACY_VERSION, MODEL_DIR, LoadedModel, get_registry
+import shared_model
 
-def load_dataset(filepath):
-    """Loads the dataset from a file."""
+# Online model: stateless hashed features, so new samples can be folded in
+# with partial_fit instead of refitting a TF-IDF vocabulary from scratch.
+ONLINE_STATE_FILE = os.path.join(MODEL_DIR, "online_state.json")
+ONLINE_CLASSES = np.array(['safe', 'scam'])
+ONLINE_EPOCHS = 5
+ONLINE_BATCH_SIZE = 256
+# Old samples replayed alongside each update (per new sample) so the model
+# doesn't drift towards whatever class the update happens to contain.
+ONLINE_REPLAY_RATIO = 4
+
+# Search mode: every feature configuration is fitted once and its matrix is
+# shared by all classifier candidates. Classifiers must support predict_proba.
+SEARCH_FEATURES = {
+    "tfidf-1gram": lambda: TfidfVectorizer(ngram_range=(1, 1)),
+    "tfidf-1-2gram": lambda: TfidfVectorizer(ngram_range=(1, 2)),
+    "tfidf-1-2gram-sublinear-mindf2": lambda: TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True),
+    "hashing-1-2gram": lambda: HashingVectorizer(ngram_range=(1, 2), n_features=2**18, alternate_sign=False),
+}
+SEARCH_CLASSIFIERS = {
+    "sgd-alpha1e-3": lambda: SGDClassifier(loss='log_loss', penalty='l2', alpha=1e-3, random_state=42, max_iter=5, tol=None, class_weight='balanced'),
+    "sgd-alpha1e-4": lambda: SGDClassifier(loss='log_loss', penalty='l2', alpha=1e-4, random_state=42, max_iter=20, tol=None, class_weight='balanced'),
+    "sgd-alpha1e-5": lambda: SGDClassifier(loss='log_loss', penalty='l2', alpha=1e-5, random_state=42, max_iter=20, tol=None, class_weight='balanced'),
+    "logreg-C1": lambda: LogisticRegression(C=1.0, class_weight='balanced', max_iter=1000),
+    "logreg-C10": lambda: LogisticRegression(C=10.0, class_weight='balanced', max_iter=1000),
+    "complement-nb": lambda: ComplementNB(alpha=0.3),
+}
+SEARCH_REPORT_FILE = os.path.join(MODEL_DIR, "search_report.json")
+# Single-message scoring calls timed per candidate (guardian scores one message at a time)
+SEARCH_LATENCY_SAMPLES = 200
+
+# Scam-probability thresholds guardian flags at (unknown senders, saved
+# contacts); a compact export is judged by whether verdicts agree there.
+OPERATING_THRESHOLDS = (0.4, 0.85)
+
+def load_new_scams(filepath):
+    """Loads the comma-separated, headerless user-reported scams file."""
     try:
-        # Attempt to read as tab-separated, falling back if needed
-        df = pd.read_csv(filepath, sep='\t', header=None, names=['label', 'text'], on_bad_lines='skip')
-        
-        # Check if it looks right (2 columns)
-        if df.shape[1] != 2:
-             # Try reading with a different separator or engine if needed, but for now assume tab based on preview
-             print("Warning: Dataset might not be parsed correctly. Checking head:")
-             print(df.head())
-
-        # Map labels to 'scam' and 'safe'
-        # File has 'fraud' and 'normal'
-        label_map = {
-            'fraud': 'scam',
-            'normal': 'safe'
-        }
-        df['label'] = df['label'].map(label_map)
-        
-        # Drop rows with unmapped labels (if any)
-        df = df.dropna(subset=['label'])
-        
-        return df
+        chunks = list(read_new_scams(filepath))
+        if not chunks:
+            return pd.DataFrame(columns=['label', 'text'])
+        return pd.concat(chunks, ignore_index=True)[['label', 'text']]
     except Exception as e:
-        print(f"Error loading dataset: {e}")
+        print(f"Error loading new scams: {e}")
         return None
 
 def train_text_model():
     print("🧠 Training Text Scam Detector (SVM + Context)...")
     
-    data_file = "fraud_call.file"
-    if not os.path.exists(data_file):
-        print(f"❌ Error: Dataset file '{data_file}' not found.")
-        return
-
-    df = load_dataset(data_file)
-    if df is None or df.empty:
+    # All four corpora, deduplicated (served from the preprocessed cache when unchanged)
+    df = load_corpus()
+    if df.empty:
         print("❌ Error: Dataset is empty or could not be loaded.")
         return
 
-    print(f"Loaded {len(df)} samples from main dataset.")
-
-    # Load new scams
-    new_scams_file = "new_scams.csv"
-    if os.path.exists(new_scams_file):
-        df_new = load_dataset(new_scams_file) # Re-using load_dataset might fail if format differs slightly, but let's check. 
-        # Actually new_scams.csv is comma separated, fraud_call.file was tab separated but load_dataset handles csv with tab fallback?
-        # Let's look at load_dataset again. It uses pd.read_csv with sep='\t'.
-        # We should probably just read it directly since we know the format of new_scams.csv
-        try:
-            df_new = pd.read_csv(new_scams_file, header=None, names=['label', 'text'])
-            # Ensure labels are mapped if needed, but they are already 'fraud'
-            df_new['label'] = df_new['label'].map({'fraud': 'scam', 'normal': 'safe'})
-            df_new = df_new.dropna(subset=['label'])
-            print(f"Loaded {len(df_new)} samples from new scams.")
-            df = pd.concat([df, df_new], ignore_index=True)
-        except Exception as e:
-            print(f"Error loading new scams: {e}")
+    print(df['source'].value_counts())
 
     print(f"Total samples: {len(df)}")
     print(df['label'].value_counts())
@@ -93,9 +101,9 @@ def train_text_model():
     print("Retraining on full dataset...")
     model.fit(df['text'], df['label'])
     
-    # Save
-    joblib.dump(model, "text_model.pkl")
-    print("✅ Model saved to 'text_model.pkl'")
+    # Save as a new version; running guardian processes pick it up without a restart
+    version = get_registry().publish(model)
+    print(f"✅ Model published as version '{version}'")
     
     # Test
     test_msgs = [
@@ -116,5 +124,350 @@ def train_text_model():
         
         print(f"'{msg}': {scam_prob:.4f} (Scam Probability)")
 
+def build_online_model(class_weight):
+    """Hashed unigrams+bigrams + logistic SGD; supports partial_fit."""
+    return make_pipeline(
+        HashingVectorizer(ngram_range=(1, 2), n_features=2**20, alternate_sign=False),
+        SGDClassifier(loss='log_loss', penalty='l2', alpha=1e-3, random_state=42, class_weight=class_weight)
+    )
+
+def _partial_fit(model, texts, labels, epochs=ONLINE_EPOCHS, seed=42):
+    """Mini-batch partial_fit passes over (texts, labels)."""
+    vectorizer, classifier = model[0], model[-1]
+    X = vectorizer.transform(list(texts))
+    y = np.asarray(list(labels))
+    rng = np.random.RandomState(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        for start in range(0, len(order), ONLINE_BATCH_SIZE):
+            batch = order[start:start + ONLINE_BATCH_SIZE]
+            classifier.partial_fit(X[batch], y[batch], classes=ONLINE_CLASSES)
+
+def _load_online_state():
+    try:
+        with open(ONLINE_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_online_state(state):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    tmp = f"{ONLINE_STATE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp, ONLINE_STATE_FILE)
+
+def _base_corpus():
+    """Every training corpus (cached), plus the new_scams.csv row count."""
+    df = load_corpus()[['label', 'text']]
+    path = os.path.join(BASE_DIR, "new_scams.csv")
+    df_new = load_new_scams(path) if os.path.exists(path) else None
+    return df, df_new
+
+def _confirmed_alerts(state=None):
+    """
+    Confirmed scam alerts of every protected user as a training frame, plus
+    the per-user watermarks ({user: last alert id}) to resume from.
+    """
+    state = state or {}
+    watermarks = dict(state.get("last_alert_ids", {}))
+    if "last_alert_id" in state:
+        # State written before alerts were sharded per user
+        watermarks.setdefault(db.DEFAULT_USER, state["last_alert_id"])
+    messages = []
+    for user in db.list_users():
+        rows = db.get_confirmed_messages(watermarks.get(user, 0), user=user)
+        messages += [message for _, message in rows]
+        if rows:
+            watermarks[user] = rows[-1][0]
+    return pd.DataFrame({'label': 'scam', 'text': messages}), watermarks
+
+def rebuild_online_model():
+    """Periodic full rebuild of the online model from every known sample."""
+    print("🧠 Rebuilding online scam detector (hashed features + SGD)...")
+    started = time.time()
+
+    df, df_new = _base_corpus()
+    new_scams_rows = len(df_new) if df_new is not None else 0
+    if df.empty:
+        print("❌ Error: Dataset is empty or could not be loaded.")
+        return
+    df_alerts, last_alert_ids = _confirmed_alerts()
+    df = pd.concat([df, df_alerts], ignore_index=True)
+    print(f"Total samples: {len(df)} ({len(df_alerts)} confirmed alerts)")
+
+    # 'balanced' isn't supported by partial_fit, so fix the weights up front
+    counts = df['label'].value_counts()
+    class_weight = {label: len(df) / (len(counts) * count) for label, count in counts.items()}
+
+    X_train, X_test, y_train, y_test = train_test_split(df['text'], df['label'], test_size=0.2, random_state=42)
+    model = build_online_model(class_weight)
+    _partial_fit(model, X_train, y_train)
+    print("Evaluating model...")
+    print(classification_report(y_test, model.predict(X_test)))
+
+    print("Retraining on full dataset...")
+    model = build_online_model(class_weight)
+    _partial_fit(model, df['text'], df['label'])
+
+    version = get_registry().publish(model, version=f"online-{time.strftime('%Y%m%d-%H%M%S')}")
+    _save_online_state({
+        "version": version,
+        "class_weight": class_weight,
+        "new_scams_rows": new_scams_rows,
+        "last_alert_ids": last_alert_ids,
+    })
+    print(f"✅ Online model published as version '{version}' in {time.time() - started:.1f}s")
+
+def update_online_model():
+    """
+    Folds samples added since the last update (new rows in new_scams.csv and
+    newly confirmed alerts) into the live online model and publishes it.
+    """
+    state = _load_online_state()
+    registry = get_registry()
+    if not state.get("version") or not os.path.exists(registry.artifact_path(state["version"])):
+        print("No online model yet, running a full rebuild.")
+        return rebuild_online_model()
+
+    started = time.time()
+    df, df_new = _base_corpus()
+    new_scams_rows = len(df_new) if df_new is not None else 0
+    df_new = df_new.iloc[state.get("new_scams_rows", 0):] if df_new is not None else df.iloc[0:0]
+    df_alerts, last_alert_ids = _confirmed_alerts(state)
+    df_update = pd.concat([df_new, df_alerts], ignore_index=True)
+
+    if df_update.empty:
+        print("✅ Online model is up to date.")
+        return
+
+    print(f"Folding in {len(df_new)} new scams and {len(df_alerts)} confirmed alerts...")
+    replay = df.sample(n=min(len(df), ONLINE_REPLAY_RATIO * len(df_update)), random_state=int(started))
+    df_update = pd.concat([df_update, replay], ignore_index=True)
+
+    model = joblib.load(registry.artifact_path(state["version"]))
+    _partial_fit(model, df_update['text'], df_update['label'], seed=int(started))
+
+    version = registry.publish(model, version=f"online-{time.strftime('%Y%m%d-%H%M%S')}")
+    state.pop("last_alert_id", None)
+    state.update(version=version, new_scams_rows=new_scams_rows, last_alert_ids=last_alert_ids)
+    _save_online_state(state)
+    print(f"✅ Online model published as version '{version}' in {time.time() - started:.1f}s")
+
+def _evaluate_candidate(feature_name, classifier_name, classifier, X_train, y_train, X_test, y_test):
+    """Process-pool worker: fit one classifier on a shared feature matrix and score it."""
+    started = time.perf_counter()
+    classifier.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    predictions = classifier.predict(X_test)
+    return {
+        "features": feature_name,
+        "classifier": classifier_name,
+        "accuracy": accuracy_score(y_test, predictions),
+        "scam_f1": f1_score(y_test, predictions, pos_label='scam'),
+        "fit_seconds": fit_seconds,
+    }, classifier
+
+def _single_message_latency_ms(pipeline, texts):
+    """Median wall time of pipeline.predict_proba([text]), the way guardian calls it."""
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        pipeline.predict_proba([text])
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000)
+
+def search_models(max_latency_ms=None, latency_weight=0.002, workers=None, publish=True):
+    """
+    Grid search over SEARCH_FEATURES x SEARCH_CLASSIFIERS.
+    Candidates are fitted in a process pool across all cores. Each one is
+    reported with accuracy, single-message latency and pickled size. The
+    winner maximizes accuracy - latency_weight * latency_ms among candidates
+    within max_latency_ms; it is then refitted on the full data and published.
+    """
+    print("🔎 Searching feature/classifier combinations...")
+    df = load_corpus()
+    if df.empty:
+        print("❌ Error: Dataset is empty or could not be loaded.")
+        return None
+
+    X_train, X_test, y_train, y_test = train_test_split(df['text'], df['label'], test_size=0.2, random_state=42)
+    latency_texts = list(X_test[:SEARCH_LATENCY_SAMPLES])
+
+    vectorizers = {}
+    futures = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for feature_name, make_vectorizer in SEARCH_FEATURES.items():
+            # Fit each feature configuration once and reuse its matrix for every classifier
+            vectorizer = make_vectorizer().fit(X_train)
+            vectorizers[feature_name] = vectorizer
+            F_train = vectorizer.transform(X_train)
+            F_test = vectorizer.transform(X_test)
+            for classifier_name, make_classifier in SEARCH_CLASSIFIERS.items():
+                futures.append(pool.submit(
+                    _evaluate_candidate, feature_name, classifier_name, make_classifier(),
+                    F_train, y_train, F_test, y_test
+                ))
+
+        results = []
+        for future in futures:
+            try:
+                result, classifier = future.result()
+            except Exception as e:
+                print(f"Candidate failed: {e}")
+                continue
+            pipeline = make_pipeline(vectorizers[result["features"]], classifier)
+            result["latency_ms"] = _single_message_latency_ms(pipeline, latency_texts)
+            result["size_bytes"] = len(pickle.dumps(pipeline))
+            results.append(result)
+
+    for result in results:
+        within_budget = max_latency_ms is None or result["latency_ms"] <= max_latency_ms
+        result["score"] = result["accuracy"] - latency_weight * result["latency_ms"] if within_budget else None
+
+    results.sort(key=lambda r: (r["score"] is not None, r["score"] or 0.0), reverse=True)
+
+    print(f"\n{'features':<32} {'classifier':<15} {'acc':>6} {'f1':>6} {'ms/msg':>7} {'size KB':>8} {'score':>7}")
+    for r in results:
+        score = f"{r['score']:.4f}" if r["score"] is not None else "-"
+        print(f"{r['features']:<32} {r['classifier']:<15} {r['accuracy']:.4f} {r['scam_f1']:.4f} "
+              f"{r['latency_ms']:7.3f} {r['size_bytes'] / 1024:8.1f} {score:>7}")
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with open(SEARCH_REPORT_FILE, "w") as f:
+        json.dump({"max_latency_ms": max_latency_ms, "latency_weight": latency_weight, "candidates": results}, f, indent=4)
+    print(f"\nReport saved to '{SEARCH_REPORT_FILE}'")
+
+    if not results or results[0]["score"] is None:
+        print("❌ No candidate meets the latency budget.")
+        return None
+
+    best = results[0]
+    print(f"🏆 Best: {best['features']} + {best['classifier']} "
+          f"(accuracy {best['accuracy']:.4f}, {best['latency_ms']:.3f} ms/msg)")
+
+    if publish:
+        print("Retraining best candidate on full dataset...")
+        model = make_pipeline(SEARCH_FEATURES[best["features"]](), SEARCH_CLASSIFIERS[best["classifier"]]())
+        model.fit(df['text'], df['label'])
+        version = get_registry().publish(model)
+        print(f"✅ Model published as version '{version}'")
+    return best
+
+def export_compact_model(version=None, threshold=PRUNE_THRESHOLD, publish=True):
+    """
+    Export a TF-IDF + linear model (the active version by default) as a
+    pruned compact_model artifact, report what pruning cost on the held-out
+    split and (by default) publish it as '<version>-compact'.
+    """
+    registry = get_registry()
+    loaded = registry.current() if version is None else registry.load(version)
+    if loaded is None:
+        print("❌ Error: No model to export.")
+        return None
+    print(f"📦 Exporting model version '{loaded.version}' (prune |w| < {threshold})...")
+    try:
+        compact = CompactModel.from_pipeline(loaded.pipeline, threshold)
+    except (ValueError, TypeError, IndexError) as e:
+        print(f"❌ Error: Cannot export version '{loaded.version}': {e}")
+        return None
+
+    df = load_corpus()
+    _, X_test, _, y_test = train_test_split(df['text'], df['label'], test_size=0.2, random_state=42)
+    X_test = list(X_test)
+    full_predictions = loaded.pipeline.predict(X_test)
+    compact_predictions = compact.predict(X_test)
+    full_accuracy = accuracy_score(y_test, full_predictions)
+    compact_accuracy = accuracy_score(y_test, compact_predictions)
+    full_scores = loaded.predict_proba(X_test)
+    compact_scores = LoadedModel(loaded.version, loaded.path, compact).predict_proba(X_test)
+    agreement = {str(t): float(np.mean((full_scores > t) == (compact_scores > t))) for t in OPERATING_THRESHOLDS}
+    full_ms = _single_message_latency_ms(loaded.pipeline, X_test[:SEARCH_LATENCY_SAMPLES])
+    compact_ms = _single_message_latency_ms(compact, X_test[:SEARCH_LATENCY_SAMPLES])
+
+    report = {
+        "source_version": loaded.version,
+        "threshold": threshold,
+        "features": compact.n_features,
+        "vocabulary_size": compact.settings["vocabulary_size"],
+        "full_accuracy": full_accuracy,
+        "compact_accuracy": compact_accuracy,
+        "accuracy_delta": compact_accuracy - full_accuracy,
+        "agreement": agreement,
+        "max_score_delta": float(np.max(np.abs(full_scores - compact_scores))),
+        "full_latency_ms": full_ms,
+        "compact_latency_ms": compact_ms,
+        "full_size_bytes": os.path.getsize(loaded.path),
+    }
+    print(f"Features kept: {report['features']} of {report['vocabulary_size']}")
+    print(f"Accuracy: full {full_accuracy:.4f}, compact {compact_accuracy:.4f} "
+          f"({report['accuracy_delta']:+.4f})")
+    print("Verdicts agree: " + ", ".join(f"{share:.2%} at {t}" for t, share in agreement.items())
+          + f" (max score delta {report['max_score_delta']:.4f})")
+    print(f"Latency: {full_ms:.3f} -> {compact_ms:.3f} ms/msg")
+
+    if publish:
+        base = "legacy" if loaded.version == LEGACY_VERSION else loaded.version
+        new_version = registry.publish(compact, version=f"{base}-compact")
+        report["compact_size_bytes"] = os.path.getsize(registry.artifact_path(new_version))
+        report["version"] = new_version
+        print(f"Size: {report['full_size_bytes'] / 1024:.0f} KB -> {report['compact_size_bytes'] / 1024:.0f} KB")
+        print(f"✅ Compact model published as version '{new_version}'")
+    return report
+
+def share_model(version=None):
+    """
+    Publish a model version (the active one by default) as the next shared
+    generation; every worker serving the shared model switches to it.
+    """
+    registry = get_registry()
+    loaded = registry.current() if version is None else registry.load(version)
+    if loaded is None:
+        print("❌ Error: No model to share.")
+        return None
+    try:
+        generation = shared_model.publish(loaded.pipeline, loaded.version)
+    except (ValueError, TypeError, IndexError) as e:
+        print(f"❌ Error: Cannot share version '{loaded.version}': {e}")
+        return None
+    print(f"✅ Model version '{loaded.version}' shared as generation {generation}")
+    return generation
+
 if __name__ == "__main__":
-    train_text_model()
+    parser = argparse.ArgumentParser(description="Train the SafeEcho text scam detector.")
+    parser.add_argument("--online", action="store_true",
+                        help="fold new scams and confirmed alerts into the online model")
+    parser.add_argument("--online-rebuild", action="store_true",
+                        help="full rebuild of the online model")
+    parser.add_argument("--search", action="store_true",
+                        help="search feature/classifier combinations and publish the best trade-off")
+    parser.add_argument("--max-latency-ms", type=float, default=None,
+                        help="search: discard candidates slower than this per message")
+    parser.add_argument("--latency-weight", type=float, default=0.002,
+                        help="search: accuracy given up per millisecond of latency")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="search: worker processes (default: all cores)")
+    parser.add_argument("--no-publish", action="store_true",
+                        help="search/compact: only report, don't publish the result")
+    parser.add_argument("--compact", action="store_true",
+                        help="export the active model as a pruned compact artifact")
+    parser.add_argument("--model-version", default=None,
+                        help="compact/share: model version to use (default: the active one)")
+    parser.add_argument("--prune-threshold", type=float, default=PRUNE_THRESHOLD,
+                        help="compact: drop features with a smaller absolute weight")
+    parser.add_argument("--share", action="store_true",
+                        help="publish the active model (or --model-version) to the shared-memory workers")
+    args = parser.parse_args()
+
+    if args.share:
+        share_model(args.model_version)
+    elif args.compact:
+        export_compact_model(args.model_version, args.prune_threshold, publish=not args.no_publish)
+    elif args.search:
+        search_models(args.max_latency_ms, args.latency_weight, args.workers, publish=not args.no_publish)
+    elif args.online_rebuild:
+        rebuild_online_model()
+    elif args.online:
+        update_online_model()
+    else:
+        train_text_model()
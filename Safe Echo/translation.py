@@ -0,0 +1,298 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+import telemetry
+from verdict_cache import VerdictCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Translations persist here across restarts
+CACHE_FILE = os.path.join(BASE_DIR, "translation_cache.db")
+
+# Google's per-request limit is 5000 characters
+MAX_BATCH_CHARS = 4500
+
+# Segments are cached individually so a phrase repeated across scripts
+# ("your account will be blocked") is translated once.
+_SEGMENT_SPLIT = re.compile(r"(?<=[.!?।॥])\s+|\n+")
+
+
+def split_segments(text):
+    """Sentences of text with whitespace collapsed (case is kept: it helps the translator)."""
+    return [s for s in (" ".join(part.split()) for part in _SEGMENT_SPLIT.split(text)) if s]
+
+
+def google_client(source="auto", target="en"):
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source=source, target=target)
+
+
+class TranslationStore:
+    """On-disk segment -> translation cache (SQLite)."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS translations (
+                                source TEXT, target TEXT, segment TEXT, translation TEXT,
+                                PRIMARY KEY (source, target, segment))""")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, source, target, segments):
+        conn = self._connect()
+        found = {}
+        segments = list(segments)
+        for i in range(0, len(segments), 500):
+            chunk = segments[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT segment, translation FROM translations "
+                                f"WHERE source = ? AND target = ? AND segment IN ({marks})",
+                                [source, target] + chunk)
+            found.update(rows)
+        return found
+
+    def put_many(self, source, target, translations):
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                             [(source, target, seg, tr) for seg, tr in translations.items()])
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures; while open, calls
+    are refused until reset_after seconds pass, then one trial call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=3, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                # Half-open: let this call through, keep refusing others
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    if self.opened_at is None:
+                        telemetry.inc("safeecho_translation_circuit_open_total")
+                    self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class Translator:
+    """
+    Translation to English with memoization and batching.
+
+    memory LRU -> on-disk cache -> one batched request for the remaining
+    segments, bounded by timeout and guarded by a circuit breaker.
+    translate() returns None instead of raising or stalling when the
+    service is slow or down; callers fall back to the original text.
+
+    Concurrent translate() calls (live monitor workers, AsyncGuardian) are
+    coalesced: while one flush is in flight, new texts queue up and the
+    next caller sends all of them through one translate_many().
+    """
+
+    def __init__(self, target="en", cache_path=CACHE_FILE, memory_size=20000, timeout=3.0,
+                 failure_threshold=3, reset_after=30.0, client_factory=google_client, workers=4):
+        self.target = target
+        self.timeout = timeout
+        self.client_factory = client_factory
+        self.memory = VerdictCache(maxsize=memory_size, ttl=7 * 24 * 3600)
+        self.store = TranslationStore(cache_path) if cache_path else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+        self._pending = []
+        self._flushing = False
+        self._cond = threading.Condition()
+
+    def _client(self, source):
+        """One reusable client per worker thread and source language."""
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        if source not in clients:
+            clients[source] = self.client_factory(source=source, target=self.target)
+        return clients[source]
+
+    def _request(self, source, segments):
+        """Translate segments in as few round trips as possible (runs on the pool)."""
+        client = self._client(source)
+        result = {}
+        batch, size = [], 0
+        for segment in segments + [None]:
+            if batch and (segment is None or size + len(segment) + 1 > MAX_BATCH_CHARS):
+                translated = client.translate("\n".join(batch)).split("\n")
+                if len(translated) == len(batch):
+                    result.update(zip(batch, (t.strip() for t in translated)))
+                else:
+                    # The service merged or split lines; fall back to one call per segment
+                    result.update((seg, client.translate(seg)) for seg in batch)
+                batch, size = [], 0
+            if segment is not None:
+                batch.append(segment)
+                size += len(segment) + 1
+        return result
+
+    def translate_many(self, texts, source="auto"):
+        """
+        Translations for texts (None for each text that could not be
+        translated in time). Missing segments of all texts go out as one batch.
+        """
+        split = [split_segments(text) for text in texts]
+        known = {}
+        missing = set()
+        for segments in split:
+            for segment in segments:
+                if segment in known or segment in missing:
+                    continue
+                cached = self.memory.get((source, self.target, segment))
+                if cached is not None:
+                    known[segment] = cached
+                else:
+                    missing.add(segment)
+
+        if missing and self.store is not None:
+            with telemetry.span("translation_cache"):
+                stored = self.store.get_many(source, self.target, missing)
+            for segment, translation in stored.items():
+                known[segment] = translation
+                self.memory.put((source, self.target, segment), translation)
+            missing -= stored.keys()
+
+        if missing:
+            fetched = self._fetch(source, sorted(missing))
+            if fetched:
+                known.update(fetched)
+
+        results = []
+        for segments in split:
+            if all(segment in known for segment in segments):
+                results.append(" ".join(known[segment] for segment in segments))
+            else:
+                results.append(None)
+        return results
+
+    def translate(self, text, source="auto"):
+        """Translation of one text (None on failure), batched with any concurrent callers."""
+        future = Future()
+        with self._cond:
+            self._pending.append((text, source, future))
+            while self._flushing and not future.done():
+                self._cond.wait()
+            if future.done():
+                return future.result()
+            self._flushing = True
+            batch, self._pending = self._pending, []
+        try:
+            self._flush(batch)
+        finally:
+            with self._cond:
+                self._flushing = False
+                self._cond.notify_all()
+        return future.result()
+
+    def _flush(self, batch):
+        """One translate_many() per source language for the queued (text, source, future) items."""
+        telemetry.inc("safeecho_translation_flushes_total")
+        telemetry.inc("safeecho_translation_flushed_texts_total", len(batch))
+        by_source = {}
+        for text, source, future in batch:
+            by_source.setdefault(source, []).append((text, future))
+        for source, items in by_source.items():
+            try:
+                translations = self.translate_many([text for text, _ in items], source)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), translation in zip(items, translations):
+                future.set_result(translation)
+
+    def _fetch(self, source, segments):
+        if not self.breaker.allow():
+            telemetry.inc("safeecho_translation_degraded_total", reason="circuit_open")
+            return None
+        future = self._pool.submit(self._request, source, segments)
+        # Cache the answer even if it arrives after we stopped waiting
+        future.add_done_callback(lambda f: self._remember(source, f))
+        try:
+            with telemetry.span("translate_request"):
+                fetched = future.result(timeout=self.timeout)
+        except TimeoutError:
+            # The request keeps running on the pool; nobody waits for it
+            telemetry.inc("safeecho_translation_degraded_total", reason="timeout")
+            self.breaker.record(False)
+            return None
+        except Exception as e:
+            telemetry.inc("safeecho_translation_degraded_total", reason=type(e).__name__)
+            self.breaker.record(False)
+            return None
+        self.breaker.record(True)
+        return fetched
+
+    def _remember(self, source, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        fetched = future.result()
+        for segment, translation in fetched.items():
+            self.memory.put((source, self.target, segment), translation)
+        if self.store is not None:
+            try:
+                self.store.put_many(source, self.target, fetched)
+            except sqlite3.Error as e:
+                print(f"Error saving translations: {e}")
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["circuit_open"] = self.breaker.is_open
+        return stats
+
+
+_translator = None
+_translator_lock = threading.Lock()
+
+def get_translator():
+    global _translator
+    if _translator is None:
+        with _translator_lock:
+            if _translator is None:
+                _translator = Translator()
+    return _translator
+
+def set_translator(translator):
+    """Replace the shared translator (e.g. with a local stand-in client)."""
+    global _translator
+    _translator = translator
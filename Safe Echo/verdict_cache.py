@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """
+    Cache key form of a message: lowercased with whitespace collapsed.
+    The keyword rules do see spacing ("gift  card" vs "gift card"), so
+    guardian scores this form rather than the raw text; messages that share
+    a key always get the same verdict.
+    """
+    return " ".join(text.lower().split())
+
+
+class VerdictCache:
+    """
+    Bounded LRU cache of verdicts with a time-to-live.
+    The cache is tied to a token (the loaded model and its file signature);
+    binding a different token empties it, so verdicts never outlive the
+    model that produced them.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._token = None
+        self._lock = threading.Lock()
+
+    def bind(self, token):
+        """Empty the cache if token differs from the one it was filled under."""
+        if token != self._token:
+            with self._lock:
+                if token != self._token:
+                    self._data.clear()
+                    self._token = token
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
@@ -1,13 +1,14 @@
 import guardian
-import joblib
 
 def verify_detection():
     print("🔍 Verifying Detection Logic...")
 
     # Load model to ensure it's the latest
     try:
-        guardian.model = joblib.load("text_model.pkl")
-        print("✅ Model loaded successfully.")
+        m = guardian.registry.refresh() or guardian.registry.current()
+        if m is None:
+            raise FileNotFoundError("no trained model found")
+        print(f"✅ Model loaded successfully (version {m.version}).")
     except Exception as e:
         print(f"❌ Error loading model: {e}")
         return
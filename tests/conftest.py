@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Safe Echo"))
+
+import db
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """Point every alert shard at tmp_path for the duration of a test."""
+    monkeypatch.setattr(db, "STORE_FILE", str(tmp_path / "alerts.db"))
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "cloud_db.json"))
+    monkeypatch.setattr(db, "_stores", {})
+    monkeypatch.setattr(db, "_writers", {})
+    return tmp_path
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import db
+
+# Every alert shares this timestamp, so the pages are ordered by the tie-breakers alone
+TIMESTAMP = datetime.now().replace(microsecond=0).isoformat()
+
+
+def _alerts(n, prefix="alert"):
+    alerts = []
+    for i in range(n):
+        alert = db.make_alert("SMS/Text", "High", f"{prefix} {i}", "Quarantined", message=f"{prefix} {i}")
+        alert["Timestamp"] = TIMESTAMP
+        alerts.append(alert)
+    return alerts
+
+def _pages(fetch, limit):
+    seen, cursor = [], None
+    while True:
+        page, cursor = fetch(limit=limit, cursor=cursor)
+        assert len(page) <= limit
+        seen.extend(page)
+        if cursor is None:
+            return seen
+
+
+def test_pages_cover_every_alert_once(store_dir):
+    store = db.get_store()
+    store.append(_alerts(23))
+    alerts = _pages(store.query, limit=5)
+    assert [a["Details"] for a in alerts] == [f"alert {i}" for i in reversed(range(23))]
+    assert len({a["Id"] for a in alerts}) == 23
+
+def test_filters_apply_across_pages(store_dir):
+    store = db.get_store()
+    alerts = _alerts(10)
+    for alert in alerts[::2]:
+        alert["Risk"] = "Low"
+    store.append(alerts)
+    low = _pages(lambda **kw: store.query(risk="Low", **kw), limit=2)
+    assert [a["Details"] for a in low] == [f"alert {i}" for i in (8, 6, 4, 2, 0)]
+
+def test_all_users_pages_break_ties_across_shards(store_dir):
+    for user in ("alice", "bob", "carol"):
+        db.get_store(user).append(_alerts(7, prefix=user))
+    alerts = _pages(lambda **kw: db.query_all_users(users=["alice", "bob", "carol"], **kw), limit=4)
+    assert len(alerts) == 21
+    assert len({(a["User"], a["Id"]) for a in alerts}) == 21
+    # Newest first, ties broken by user then id, both descending
+    assert [(a["User"], a["Id"]) for a in alerts] == sorted(((a["User"], a["Id"]) for a in alerts), reverse=True)
+
+def test_confirm_alert_from_a_page(store_dir):
+    store = db.get_store("alice")
+    store.append(_alerts(3))
+    page, _ = db.query_all_users(users=["alice"])
+    assert db.confirm_alert(page[0]["Id"], user=page[0]["User"])
+    confirmed, _ = db.query_alerts(status=db.CONFIRMED_STATUS, user="alice")
+    assert [a["Id"] for a in confirmed] == [page[0]["Id"]]
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from model_registry import ACTIVE_FILE, ARTIFACT_PREFIX, ARTIFACT_SUFFIX, ModelLoadError, ModelRegistry
+
+
+def _pipeline():
+    texts = ["see you at dinner", "call me when you land", "you won a prize, send your bank pin",
+             "verify your account now or it will be blocked"]
+    return Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression())]).fit(
+        texts, ["safe", "safe", "scam", "scam"])
+
+def _corrupt(registry, version):
+    with open(os.path.join(registry.model_dir, f"{ARTIFACT_PREFIX}{version}{ARTIFACT_SUFFIX}"), "wb") as f:
+        f.write(b"not a pickle")
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = ModelRegistry(model_dir=str(tmp_path / "models"), legacy_path=str(tmp_path / "none.pkl"),
+                             check_interval=0)
+    registry.publish(_pipeline(), version="v1")
+    return registry
+
+
+def test_failed_activate_keeps_serving(registry):
+    _corrupt(registry, "v2")
+    with pytest.raises(ModelLoadError):
+        registry.activate("v2")
+    assert registry.current().version == "v1"
+    with open(os.path.join(registry.model_dir, ACTIVE_FILE)) as f:
+        assert f.read() == "v1"
+
+def test_failed_reload_rolls_back(registry):
+    assert registry.current().version == "v1"
+    _corrupt(registry, "v2")
+    with open(os.path.join(registry.model_dir, ACTIVE_FILE), "w") as f:
+        f.write("v2")
+    assert registry.current().version == "v1"
+    # A good artifact for the pointer is picked up on the next check
+    registry.publish(_pipeline(), version="v2", activate=False)
+    assert registry.current().version == "v2"
+
+def test_reload_gets_a_new_token(registry):
+    first = registry.current()
+    assert registry.activate("v1").token != first.token
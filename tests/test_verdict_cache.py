@@ -0,0 +1,52 @@
+import pytest
+
+import guardian
+import reputation
+from verdict_cache import VerdictCache, normalize_text
+
+# Pairs that share a cache key but differ in case or spacing
+VARIANTS = [
+    ("Buy a gift  card and send me the code", "buy a gift card and send me the code"),
+    ("URGENT: your account\nis   blocked, verify now", "urgent: your account is blocked, verify now"),
+    ("Hi Mom,  lunch at 1?", "hi mom, lunch at 1?"),
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(store_dir, monkeypatch):
+    monkeypatch.setattr(reputation, "_index", reputation.ReputationIndex())
+    guardian.verdict_cache.clear()
+    yield
+    guardian.verdict_cache.clear()
+
+
+@pytest.mark.parametrize("first, second", VARIANTS)
+def test_same_key_same_verdict(first, second):
+    assert normalize_text(first) == normalize_text(second)
+    uncached = guardian.analyze_text(second)
+    guardian.verdict_cache.clear()
+    guardian.analyze_text(first)
+    hits = guardian.verdict_cache.hits
+    assert guardian.analyze_text(second) == uncached
+    assert guardian.verdict_cache.hits == hits + 1
+
+@pytest.mark.parametrize("first, second", VARIANTS)
+def test_batch_matches_single(first, second):
+    singles = [guardian.analyze_text(text) for text in (first, second)]
+    guardian.verdict_cache.clear()
+    assert guardian.analyze_texts([first, second]) == singles
+
+def test_saved_contact_is_part_of_the_key():
+    text = "Please verify your account immediately."
+    unknown = guardian.analyze_text(text)
+    saved = guardian.analyze_text(text, {"is_saved_contact": True})
+    guardian.verdict_cache.clear()
+    assert guardian.analyze_text(text, {"is_saved_contact": True}) == saved
+    assert guardian.analyze_text(text) == unknown
+
+def test_rebinding_empties_the_cache():
+    cache = VerdictCache()
+    cache.bind("a")
+    cache.put("key", "verdict")
+    cache.bind("b")
+    assert cache.get("key") is None